@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+# Version batch (DuckDB), même sortie pour chaque URL et bien plus rapide sur les
+# gros exports : sortlist-analyzer/src/url_categories.py
 
 import argparse
 from urllib.parse import urlparse
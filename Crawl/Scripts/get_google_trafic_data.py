@@ -3,6 +3,15 @@
 Script complet pour extraire le trafic via l'API Search Console sur 6 mois,
 à partir d'un CSV d'URLs, avec reprise sur crash.
 
+Par défaut (--mode bulk), tout le site est lu en requêtes paginées de 25 000
+pages puis joint localement aux URLs ; seules les URLs absentes sont
+interrogées une par une, en parallèle sous limiteur de débit (voir
+searchconsole_api.py). --stub traffic.csv remplace l'API par un bouchon local.
+
+--daily-dir DIR : trafic stocké par jour (page x jour) en Parquet, seuls les
+jours manquants sont téléchargés et l'agrégat 6 mois est recalculé localement
+(voir searchconsole_daily.py ; duckdb requis).
+
 Pré-requis :
     python3 -m pip install --upgrade pip
     python3 -m pip install google-api-python-client google-auth google-auth-httplib2 python-dateutil
@@ -17,14 +26,14 @@ import time
 import datetime
 import argparse
 from dateutil.relativedelta import relativedelta
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 import logging
 import sys
+from searchconsole_api import DEFAULT_QPS, DEFAULT_WORKERS, build_service, fetch_traffic
+from searchconsole_checkpoint import DEFAULT_BATCH_SIZE, TrafficCheckpoint, default_checkpoint_path
+from searchconsole_daily import DEFAULT_LAG_DAYS, refresh_daily
 
 # ------------ CONFIGURATION PAR DÉFAUT ------------
 KEY_FILE_LOCATION = '/Volumes/T7/sortlist/leafy-brace-242115-c73d373e2d41.json'
-SCOPES = ['https://www.googleapis.com/auth/webmasters.readonly']
 SITE_URL = 'https://www.sortlist.com'
 # Chemin par défaut du CSV d'entrée
 INPUT_CSV_DEFAULT = '/Volumes/T7/sortlist/Crawl/interne_html-sortlist.csv'
@@ -39,6 +48,31 @@ parser.add_argument('--output', '-o', default=OUTPUT_CSV_DEFAULT,
                     help=f"Chemin vers le CSV de sortie (défaut: {OUTPUT_CSV_DEFAULT})")
 parser.add_argument('--log', '-l', default=LOG_FILE_DEFAULT,
                     help=f"Chemin vers le fichier de log (défaut: {LOG_FILE_DEFAULT})")
+parser.add_argument('--mode', choices=['bulk', 'per-url'], default='bulk',
+                    help="bulk : export paginé de tout le site puis requêtes par URL pour les absentes ; "
+                         "per-url : une requête par URL (défaut: bulk)")
+parser.add_argument('--no-fallback', action='store_true',
+                    help="En mode bulk, écrire des zéros pour les URLs absentes de l'export au lieu de les interroger")
+parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                    help=f"Requêtes par URL en parallèle (défaut: {DEFAULT_WORKERS})")
+parser.add_argument('--qps', type=float, default=DEFAULT_QPS,
+                    help=f"Débit maximal en requêtes par seconde (défaut: {DEFAULT_QPS:g})")
+parser.add_argument('--checkpoint',
+                    help="Base SQLite de l'état de reprise (défaut: <sortie>.checkpoint.sqlite)")
+parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                    help=f"URLs validées par lot dans le CSV et l'état de reprise (défaut: {DEFAULT_BATCH_SIZE})")
+parser.add_argument('--max-retries', type=int, default=3,
+                    help="Nouvelles tentatives des URLs en échec avant de rendre la main (défaut: 3)")
+parser.add_argument('--retry-delay', type=float, default=30.0,
+                    help="Attente avant la première nouvelle tentative, doublée à chaque tour (défaut: 30s)")
+parser.add_argument('--daily-dir',
+                    help="Trafic partitionné par jour en Parquet dans ce dossier : seuls les jours manquants sont "
+                         "téléchargés, puis l'agrégat 6 mois y est recalculé (le CSV d'entrée n'est pas lu)")
+parser.add_argument('--lag-days', type=int, default=DEFAULT_LAG_DAYS,
+                    help=f"Mode --daily-dir : jours récents ignorés, non encore définitifs (défaut: {DEFAULT_LAG_DAYS})")
+parser.add_argument('--stub', help="CSV de trafic servi par un bouchon local de l'API (tests, sans credentials)")
+parser.add_argument('--stub-max-rows', type=int, help="Lignes visibles en bulk dans le bouchon")
+parser.add_argument('--stub-latency', type=float, default=0.0, help="Latence simulée du bouchon, en secondes")
 args = parser.parse_args()
 INPUT_CSV = args.input
 OUTPUT_CSV = args.output
@@ -61,16 +95,22 @@ today = datetime.date.today()
 six_months_ago = today - relativedelta(months=6)
 
 # ------------ AUTHENTIFICATION ------------
-logging.info("Authentification avec Google API...")
-try:
-    credentials = service_account.Credentials.from_service_account_file(
-        KEY_FILE_LOCATION,
-        scopes=SCOPES
-    )
-    service = build('searchconsole', 'v1', credentials=credentials)
-except Exception as e:
-    logging.error(f"Échec de l'authentification : {e}")
-    sys.exit(1)
+if args.stub:
+    from searchconsole_stub import StubSearchConsole
+    stub = StubSearchConsole.from_csv(args.stub, max_rows=args.stub_max_rows, latency=args.stub_latency)
+    logging.info(f"Bouchon Search Console : {len(stub.metrics)} pages depuis {args.stub}")
+else:
+    logging.info("Authentification avec Google API...")
+    try:
+        build_service(KEY_FILE_LOCATION)
+    except Exception as e:
+        logging.error(f"Échec de l'authentification : {e}")
+        sys.exit(1)
+
+
+def service_factory():
+    # Un client par thread (voir searchconsole_api.build_service)
+    return stub if args.stub else build_service(KEY_FILE_LOCATION)
 
 # ------------ FONCTIONS UTILES ------------
 
@@ -110,91 +150,62 @@ def load_input_urls(path):
     return urls
 
 
-def load_processed_urls(path):
-    processed = set()
-    if os.path.exists(path):
-        with open(path, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                processed.add(row.get('URL', '').strip())
-    return processed
-
-
-def init_output(path):
-    if not os.path.exists(path):
-        with open(path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['URL', 'Clicks', 'Impressions', 'CTR', 'Average Position'])
-            f.flush()
-
-
-def fetch_metrics(url):
-    request = {
-        'startDate': six_months_ago.isoformat(),
-        'endDate': today.isoformat(),
-        'dimensions': ['page'],
-        'dimensionFilterGroups': [{
-            'filters': [{
-                'dimension': 'page',
-                'operator': 'equals',
-                'expression': url
-            }]
-        }],
-        'aggregationType': 'byPage',
-        'rowLimit': 1
-    }
-    response = service.searchanalytics().query(
-        siteUrl=SITE_URL,
-        body=request
-    ).execute()
-    rows = response.get('rows', [])
-    if not rows:
-        return 0, 0, 0.0, 0.0
-    data = rows[0]
-    return (
-        data.get('clicks', 0),
-        data.get('impressions', 0),
-        data.get('ctr', 0),
-        data.get('position', 0)
-    )
-
 # ------------ BOUCLE PRINCIPALE ------------
 def main():
     logging.info("Démarrage du script...")
-    urls = load_input_urls(INPUT_CSV)
-    total = len(urls)
-    if total == 0:
-        logging.error("Aucune URL trouvée dans le fichier d'entrée.")
+    if args.daily_dir:
+        try:
+            refresh_daily(service_factory, SITE_URL, args.daily_dir, today - datetime.timedelta(days=args.lag_days),
+                          qps=args.qps)
+        except Exception as e:
+            logging.error(f"Arrêt sur erreur : {e}")
+            sys.exit(1)
+        return
+    if not os.path.exists(INPUT_CSV):
+        logging.error(f"Fichier d'entrée non trouvé: {INPUT_CSV}")
         sys.exit(1)
+    checkpoint = TrafficCheckpoint(args.checkpoint or default_checkpoint_path(OUTPUT_CSV), OUTPUT_CSV,
+                                   batch_size=args.batch_size)
+    try:
+        checkpoint.sync_urls(INPUT_CSV, load_input_urls)
+        counts = checkpoint.counts()
+        total = sum(counts.values())
+        if total == 0:
+            logging.error("Aucune URL trouvée dans le fichier d'entrée.")
+            sys.exit(1)
+        to_process = checkpoint.pending()
+        logging.info(f"Total URLs: {total}, déjà traitées: {counts.get('done', 0)}, "
+                     f"en échec: {counts.get('failed', 0)}, reste: {len(to_process)}")
+
+        results = fetch_traffic(service_factory, SITE_URL, to_process, six_months_ago, today, mode=args.mode,
+                                fallback=not args.no_fallback, workers=args.workers, qps=args.qps)
+        checkpoint.write_results(results, len(to_process))
+
+        # File de reprise : les URLs en échec sont retentées une par une, avec un délai croissant
+        for attempt in range(1, args.max_retries + 1):
+            failed = checkpoint.failed()
+            if not failed:
+                break
+            delay = args.retry_delay * 2 ** (attempt - 1)
+            logging.info(f"Nouvelle tentative {attempt}/{args.max_retries} pour {len(failed)} URLs dans {delay:g}s")
+            time.sleep(delay)
+            results = fetch_traffic(service_factory, SITE_URL, failed, six_months_ago, today, mode='per-url',
+                                    workers=args.workers, qps=args.qps)
+            checkpoint.write_results(results, len(failed))
+        failed = checkpoint.failed()
+    except Exception as e:
+        logging.error(f"Arrêt sur erreur : {e}")
+        logging.info("Sauvegarde de l'état et arrêt du script.")
+        sys.exit(1)
+    finally:
+        checkpoint.close()
 
-    init_output(OUTPUT_CSV)
-    processed = load_processed_urls(OUTPUT_CSV)
-    to_process = [u for u in urls if u not in processed]
-    count = len(processed)
-    start_time = time.time()
-
-    logging.info(f"Total URLs: {total}, déjà traitées: {count}, reste: {len(to_process)}")
-
-    with open(OUTPUT_CSV, 'a', newline='', encoding='utf-8') as fout:
-        writer = csv.writer(fout)
-        for idx, url in enumerate(to_process, start=1):
-            try:
-                processed_count = count + idx
-                logging.info(f"({processed_count}/{total}) Fetching metrics for: {url}")
-                t0 = time.time()
-                clicks, impressions, ctr, position = fetch_metrics(url)
-                writer.writerow([url, clicks, impressions, f"{ctr:.4f}", f"{position:.2f}"])
-                fout.flush()
-                elapsed = time.time() - t0
-                avg_time = (time.time() - start_time) / processed_count
-                remaining = total - processed_count
-                eta = datetime.timedelta(seconds=int(avg_time * remaining))
-                logging.info(f"Done in {elapsed:.2f}s, ETA remaining: {eta}")
-            except Exception as e:
-                logging.error(f"Erreur sur {url}: {e}")
-                logging.info("Sauvegarde de l'état et arrêt du script.")
-                sys.exit(1)
+    if failed:
+        logging.error(f"{len(failed)} URLs toujours en échec, retentées au prochain lancement "
+                      f"(état : {checkpoint.path}).")
+        sys.exit(1)
     logging.info("Traitement terminé pour toutes les URLs.")
 
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Requêtes Search Console partagées par fetch_searchconsole_traffic.py et
+get_google_trafic_data.py.
+
+Mode "bulk" : toutes les pages du site sont lues en quelques requêtes paginées
+(dimension page, rowLimit 25 000, startRow) puis jointes localement à la liste
+d'URLs ; seules les URLs absentes de l'export sont interrogées une par une, en
+parallèle, sous un limiteur de débit (token bucket). Mode "per-url" : une
+requête par URL, comme avant, mais en parallèle sous le même limiteur.
+
+Une requête par URL en échec n'interrompt pas le flux : elle est produite avec
+son erreur, à charge de l'appelant de la remettre en file (voir
+searchconsole_checkpoint.py).
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+SCOPES = ['https://www.googleapis.com/auth/webmasters.readonly']
+# Nombre maximal de lignes par requête searchanalytics
+BULK_ROW_LIMIT = 25000
+# Quota Search Console : 1 200 requêtes par minute et par site
+DEFAULT_QPS = 10.0
+DEFAULT_WORKERS = 8
+
+ZERO_METRICS = (0, 0, 0.0, 0.0)
+
+
+class FetchError(Exception):
+    """Échec d'une requête pour une URL (l'exception d'origine est dans `error`)."""
+
+    def __init__(self, url, error):
+        super().__init__(f"{url}: {error}")
+        self.url = url
+        self.error = error
+
+
+def build_service(key_file):
+    """
+    Client searchconsole v1 authentifié par compte de service. Un client par
+    thread : les objets de google-api-python-client ne sont pas thread-safe.
+    """
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+    credentials = service_account.Credentials.from_service_account_file(key_file, scopes=SCOPES)
+    return build('searchconsole', 'v1', credentials=credentials, cache_discovery=False)
+
+
+class TokenBucket:
+    """
+    Limiteur de débit thread-safe : `rate` jetons par seconde, au plus
+    `capacity` d'avance (rafale). acquire() bloque jusqu'à obtenir un jeton.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def page_query(start_date, end_date, url=None, row_limit=BULK_ROW_LIMIT, start_row=0):
+    """
+    Corps de requête searchanalytics sur la dimension page ; avec `url`, filtré
+    sur cette seule page (requête historique, rowLimit 1).
+    """
+    body = {
+        'startDate': start_date.isoformat(),
+        'endDate': end_date.isoformat(),
+        'dimensions': ['page'],
+        'aggregationType': 'byPage',
+        'rowLimit': row_limit,
+        'startRow': start_row,
+    }
+    if url is not None:
+        body['dimensionFilterGroups'] = [{
+            'filters': [{
+                'dimension': 'page',
+                'operator': 'equals',
+                'expression': url
+            }]
+        }]
+        body['rowLimit'] = 1
+        del body['startRow']
+    return body
+
+
+def _metrics(row):
+    return (
+        row.get('clicks', 0),
+        row.get('impressions', 0),
+        row.get('ctr', 0),
+        row.get('position', 0)
+    )
+
+
+def fetch_metrics(service, site_url, url, start_date, end_date):
+    """
+    (clicks, impressions, ctr, position) d'une URL, zéros si elle n'a pas de données.
+    """
+    response = service.searchanalytics().query(
+        siteUrl=site_url,
+        body=page_query(start_date, end_date, url=url)
+    ).execute()
+    rows = response.get('rows', [])
+    return _metrics(rows[0]) if rows else ZERO_METRICS
+
+
+def fetch_bulk_metrics(service, site_url, start_date, end_date, limiter=None, row_limit=BULK_ROW_LIMIT):
+    """
+    {page: (clicks, impressions, ctr, position)} pour toutes les pages du site,
+    page après page de row_limit lignes (startRow), jusqu'à une page incomplète.
+    """
+    metrics = {}
+    start_row = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        response = service.searchanalytics().query(
+            siteUrl=site_url,
+            body=page_query(start_date, end_date, row_limit=row_limit, start_row=start_row)
+        ).execute()
+        rows = response.get('rows', [])
+        for row in rows:
+            metrics[row['keys'][0]] = _metrics(row)
+        logging.info(f"Export bulk : {len(rows)} lignes (startRow={start_row}), {len(metrics)} pages au total")
+        if len(rows) < row_limit:
+            return metrics
+        start_row += row_limit
+
+
+def fetch_metrics_concurrently(service_factory, site_url, urls, start_date, end_date, limiter,
+                               workers=DEFAULT_WORKERS):
+    """
+    Requêtes par URL en parallèle (un client par thread), chaque requête
+    attendant un jeton du limiteur. Produit (url, métriques, erreur) dans
+    l'ordre d'achèvement : erreur vaut None, ou une FetchError (métriques à
+    None) sans interrompre les autres requêtes.
+    """
+    local = threading.local()
+
+    def task(url):
+        if not hasattr(local, 'service'):
+            local.service = service_factory()
+        limiter.acquire()
+        return fetch_metrics(local.service, site_url, url, start_date, end_date)
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    futures = {pool.submit(task, url): url for url in urls}
+    try:
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                metrics = future.result()
+            except Exception as e:
+                yield url, None, FetchError(url, e)
+            else:
+                yield url, metrics, None
+    finally:
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=True)
+
+
+def fetch_traffic(service_factory, site_url, urls, start_date, end_date, mode='bulk', fallback=True,
+                  workers=DEFAULT_WORKERS, qps=DEFAULT_QPS):
+    """
+    Produit (url, métriques, erreur) pour chaque URL de `urls`. En mode bulk,
+    les URLs présentes dans l'export paginé sont servies sans requête dédiée ;
+    les autres sont interrogées une par une (fallback) ou mises à zéro. Une
+    erreur de l'export bulk lui-même reste levée.
+    """
+    if not urls:
+        return
+    limiter = TokenBucket(qps)
+    missing = urls
+    if mode == 'bulk':
+        bulk = fetch_bulk_metrics(service_factory(), site_url, start_date, end_date, limiter)
+        missing = []
+        for url in urls:
+            if url in bulk:
+                yield url, bulk[url], None
+            else:
+                missing.append(url)
+        logging.info(f"{len(urls) - len(missing)} URLs trouvées dans l'export bulk, {len(missing)} absentes")
+        if not fallback:
+            for url in missing:
+                yield url, ZERO_METRICS, None
+            return
+    if missing:
+        logging.info(f"Requêtes par URL pour {len(missing)} URLs ({workers} threads, {qps:g} req/s)")
+        yield from fetch_metrics_concurrently(service_factory, site_url, missing, start_date, end_date,
+                                              limiter, workers)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+État de reprise des scripts de trafic Search Console : une table SQLite à
+côté du CSV de sortie garde, pour chaque URL d'entrée, son statut (pending,
+done, failed), son nombre de tentatives et sa dernière erreur.
+
+- reprise sans relire le CSV de sortie : les URLs restantes sortent d'un index
+  partiel sur les statuts non terminés, et les URLs d'entrée ne sont
+  réinsérées que si le CSV d'entrée a changé ;
+- écritures par lots : les lignes du CSV et les statuts sont validés ensemble
+  toutes les `batch_size` lignes ou `commit_interval` secondes, au lieu d'un
+  flush par ligne. La taille du CSV validée est gardée dans la même
+  transaction ; après un crash, le CSV est tronqué à cette taille et les URLs
+  du lot perdu restent à traiter, sans doublon ;
+- une URL en échec passe en "failed" au lieu d'arrêter le script et peut être
+  retentée (failed()) ; elle reste à traiter au lancement suivant.
+
+Un CSV de sortie produit par une version précédente des scripts (sans état)
+est importé au premier lancement.
+"""
+import csv
+import datetime
+import logging
+import os
+import sqlite3
+import time
+
+OUTPUT_HEADER = ['URL', 'Clicks', 'Impressions', 'CTR', 'Average Position']
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_COMMIT_INTERVAL = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS urls_todo ON urls(status) WHERE status != 'done';
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def default_checkpoint_path(output_csv):
+    return f"{output_csv}.checkpoint.sqlite"
+
+
+def _input_fingerprint(path):
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+class TrafficCheckpoint:
+
+    def __init__(self, path, output_csv, batch_size=DEFAULT_BATCH_SIZE, commit_interval=DEFAULT_COMMIT_INTERVAL):
+        self.path = path
+        self.output_csv = output_csv
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.con = sqlite3.connect(path)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.executescript(SCHEMA)
+        self.done = []
+        self.failed_batch = []
+        self.last_commit = time.monotonic()
+        self._open_output()
+
+    # ------------ ÉTAT ------------
+
+    def _meta(self, key):
+        row = self.con.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.con.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _open_output(self):
+        """
+        Aligne le CSV de sortie sur le dernier état validé : tronque les lignes
+        écrites après la dernière validation, importe un CSV sans état, ou
+        remet les URLs à traiter si le CSV a disparu ou a été raccourci.
+        """
+        offset = self._meta('csv_offset')
+        exists = os.path.exists(self.output_csv)
+        size = os.path.getsize(self.output_csv) if exists else 0
+        if offset is None and exists and size > 0:
+            self._import_output()
+        elif offset is not None and exists and size >= int(offset):
+            if size > int(offset):
+                logging.warning(f"{size - int(offset)} octets non validés retirés de {self.output_csv}")
+                with open(self.output_csv, 'r+b') as f:
+                    f.truncate(int(offset))
+        else:
+            if offset is not None:
+                logging.warning(f"{self.output_csv} absent ou raccourci : toutes les URLs sont remises à traiter")
+                self.con.execute("UPDATE urls SET status = 'pending' WHERE status = 'done'")
+            with open(self.output_csv, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerow(OUTPUT_HEADER)
+        self._set_meta('csv_offset', os.path.getsize(self.output_csv))
+        self.con.commit()
+        self.out = open(self.output_csv, 'a', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.out)
+
+    def _import_output(self):
+        with open(self.output_csv, newline='', encoding='utf-8') as f:
+            processed = {row['URL'].strip() for row in csv.DictReader(f) if row.get('URL')}
+        self.con.executemany(
+            "INSERT INTO urls (url, status, updated_at) VALUES (?, 'done', ?) "
+            "ON CONFLICT(url) DO UPDATE SET status = 'done'",
+            ((url, time.time()) for url in processed)
+        )
+        logging.info(f"{len(processed)} URLs déjà traitées importées depuis {self.output_csv}")
+
+    def sync_urls(self, input_csv, load_urls):
+        """
+        Enregistre les URLs d'entrée (load_urls() n'est appelé que si le CSV
+        d'entrée a changé depuis le dernier lancement). Les URLs non terminées
+        qui ne sont plus en entrée sont oubliées.
+        """
+        fingerprint = _input_fingerprint(input_csv)
+        if self._meta('input') == fingerprint:
+            return
+        urls = load_urls(input_csv)
+        self.con.execute("CREATE TEMP TABLE IF NOT EXISTS inputs (url TEXT PRIMARY KEY)")
+        self.con.execute("DELETE FROM inputs")
+        self.con.executemany("INSERT OR IGNORE INTO inputs (url) VALUES (?)", ((url,) for url in urls))
+        self.con.execute("INSERT OR IGNORE INTO urls (url) SELECT url FROM inputs")
+        self.con.execute("DELETE FROM urls WHERE status != 'done' AND url NOT IN (SELECT url FROM inputs)")
+        self._set_meta('input', fingerprint)
+        self.con.commit()
+        logging.info(f"{len(urls)} URLs d'entrée enregistrées dans {self.path}")
+
+    def counts(self):
+        return dict(self.con.execute("SELECT status, COUNT(*) FROM urls GROUP BY status").fetchall())
+
+    def pending(self):
+        """URLs restantes (pending ou failed), dans l'ordre du CSV d'entrée."""
+        return [url for (url,) in self.con.execute(
+            "SELECT url FROM urls WHERE status != 'done' ORDER BY rowid")]
+
+    def failed(self):
+        return [url for (url,) in self.con.execute(
+            "SELECT url FROM urls WHERE status = 'failed' ORDER BY rowid")]
+
+    # ------------ ÉCRITURE PAR LOTS ------------
+
+    def record(self, url, metrics):
+        clicks, impressions, ctr, position = metrics
+        self.writer.writerow([url, clicks, impressions, f"{ctr:.4f}", f"{position:.2f}"])
+        self.done.append((time.time(), url))
+        self._maybe_commit()
+
+    def fail(self, url, error):
+        self.failed_batch.append((str(error)[:500], time.time(), url))
+        self._maybe_commit()
+
+    def _maybe_commit(self):
+        if (len(self.done) + len(self.failed_batch) >= self.batch_size
+                or time.monotonic() - self.last_commit >= self.commit_interval):
+            self.commit()
+
+    def commit(self):
+        """Valide le lot : CSV sur disque d'abord, puis statuts et taille du CSV en une transaction."""
+        self.out.flush()
+        os.fsync(self.out.fileno())
+        self.con.executemany(
+            "UPDATE urls SET status = 'done', attempts = attempts + 1, last_error = NULL, updated_at = ? "
+            "WHERE url = ?", self.done)
+        self.con.executemany(
+            "UPDATE urls SET status = 'failed', attempts = attempts + 1, last_error = ?, updated_at = ? "
+            "WHERE url = ?", self.failed_batch)
+        self._set_meta('csv_offset', self.out.tell())
+        self.con.commit()
+        self.done = []
+        self.failed_batch = []
+        self.last_commit = time.monotonic()
+
+    def write_results(self, results, total):
+        """
+        Consomme les (url, métriques, erreur) de searchconsole_api.fetch_traffic
+        et renvoie (écrites, en échec). Progression loggée toutes les 1000 URLs.
+        """
+        written = failures = 0
+        start = time.time()
+        for url, metrics, error in results:
+            if error is None:
+                self.record(url, metrics)
+                written += 1
+                logging.debug(f"Écrit: {url}")
+            else:
+                self.fail(url, error)
+                failures += 1
+                logging.warning(f"Erreur sur {url}: {error.error}")
+            handled = written + failures
+            if handled % 1000 == 0 or handled == total:
+                eta = datetime.timedelta(seconds=int((time.time() - start) / handled * (total - handled)))
+                logging.info(f"({handled}/{total}) URLs traitées, {failures} en échec, ETA remaining: {eta}")
+        self.commit()
+        return written, failures
+
+    def close(self):
+        self.commit()
+        self.out.close()
+        self.con.close()
+
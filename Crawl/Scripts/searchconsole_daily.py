@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Trafic Search Console partitionné par jour (page x jour), en Parquet :
+
+    <daily_dir>/date=2025-05-01/traffic.parquet   page, clicks, impressions, ctr, position
+    <daily_dir>/traffic_6m.parquet                agrégat des 6 derniers mois
+
+Chaque lancement ne télécharge que les jours absents de la fenêtre (export bulk
+d'un jour : startDate = endDate), puis recalcule l'agrégat localement : clics et
+impressions sommés, CTR = clics / impressions, position moyenne pondérée par
+les impressions, comme l'agrégation byPage de l'API. Une partition n'apparaît
+qu'une fois écrite en entier (fichier temporaire puis renommage) : un jour en
+échec est simplement retenté au lancement suivant.
+
+L'agrégat garde les colonnes du CSV de trafic (URL, Clicks, Impressions, CTR,
+Average Position) : sortlist-analyzer le lit directement
+(csv_files.traffic: .../traffic_6m.parquet).
+
+Requiert duckdb (déjà utilisé par sortlist-analyzer).
+"""
+import csv
+import datetime
+import logging
+import os
+import tempfile
+
+from dateutil.relativedelta import relativedelta
+
+from searchconsole_api import DEFAULT_QPS, TokenBucket, fetch_bulk_metrics
+
+PARTITION_FILE = 'traffic.parquet'
+ROLLUP_FILE = 'traffic_6m.parquet'
+WINDOW_MONTHS = 6
+# Les données Search Console ne sont définitives qu'après 2 à 3 jours
+DEFAULT_LAG_DAYS = 3
+
+
+def partition_path(root, day):
+    return os.path.join(root, f"date={day.isoformat()}", PARTITION_FILE)
+
+
+def window(end_day, months=WINDOW_MONTHS):
+    """Premier et dernier jour de la fenêtre glissante qui se termine à end_day."""
+    return end_day - relativedelta(months=months) + datetime.timedelta(days=1), end_day
+
+
+def missing_days(root, start_day, end_day):
+    days = []
+    day = start_day
+    while day <= end_day:
+        if not os.path.exists(partition_path(root, day)):
+            days.append(day)
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def _copy_atomically(con, query, path):
+    """COPY query vers un Parquet temporaire puis renommage ; renvoie le nombre de lignes."""
+    tmp_path = path + '.tmp'
+    rows = con.execute(f"COPY ({query}) TO '{tmp_path}' (FORMAT PARQUET)").fetchone()[0]
+    os.replace(tmp_path, path)
+    return rows
+
+
+def write_partition(con, root, day, metrics):
+    """Écrit la partition d'un jour à partir de {page: (clicks, impressions, ctr, position)}."""
+    path = partition_path(root, day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', encoding='utf-8', delete=False) as f:
+        writer = csv.writer(f)
+        writer.writerow(['page', 'clicks', 'impressions', 'ctr', 'position'])
+        writer.writerows((page, *values) for page, values in metrics.items())
+    try:
+        return _copy_atomically(con, f"""
+            SELECT * FROM read_csv('{f.name}', header=true, quote='"', columns={{
+                'page': 'VARCHAR', 'clicks': 'INTEGER', 'impressions': 'INTEGER',
+                'ctr': 'DOUBLE', 'position': 'DOUBLE'}})
+        """, path)
+    finally:
+        os.remove(f.name)
+
+
+def build_rollup(con, root, start_day, end_day):
+    """Agrège les partitions de [start_day, end_day] dans ROLLUP_FILE, au format du CSV de trafic."""
+    partitions = os.path.join(root, 'date=*', PARTITION_FILE)
+    return _copy_atomically(con, f"""
+        SELECT
+            page AS "URL",
+            CAST(SUM(clicks) AS INTEGER) AS "Clicks",
+            CAST(SUM(impressions) AS INTEGER) AS "Impressions",
+            ROUND(COALESCE(SUM(clicks) / NULLIF(SUM(impressions), 0), 0), 4) AS "CTR",
+            ROUND(COALESCE(SUM(position * impressions) / NULLIF(SUM(impressions), 0), 0), 2) AS "Average Position"
+        FROM read_parquet('{partitions}', hive_partitioning=true)
+        WHERE "date" BETWEEN DATE '{start_day.isoformat()}' AND DATE '{end_day.isoformat()}'
+        GROUP BY page
+        ORDER BY "Clicks" DESC, "URL"
+    """, os.path.join(root, ROLLUP_FILE))
+
+
+def refresh_daily(service_factory, site_url, root, end_day, months=WINDOW_MONTHS, qps=DEFAULT_QPS):
+    """
+    Télécharge les jours absents de la fenêtre se terminant à end_day, du plus
+    ancien au plus récent, puis reconstruit l'agrégat. Renvoie son nombre de pages.
+    """
+    import duckdb
+    os.makedirs(root, exist_ok=True)
+    start_day, end_day = window(end_day, months)
+    days = missing_days(root, start_day, end_day)
+    logging.info(f"Fenêtre {start_day} .. {end_day} : {len(days)} jours à télécharger dans {root}")
+    service = service_factory()
+    limiter = TokenBucket(qps)
+    con = duckdb.connect()
+    try:
+        for day in days:
+            metrics = fetch_bulk_metrics(service, site_url, day, day, limiter)
+            rows = write_partition(con, root, day, metrics)
+            logging.info(f"Partition {day} : {rows} pages")
+        pages = build_rollup(con, root, start_day, end_day)
+    finally:
+        con.close()
+    logging.info(f"Agrégat {months} mois : {pages} pages dans {os.path.join(root, ROLLUP_FILE)}")
+    return pages
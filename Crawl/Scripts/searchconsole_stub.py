@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Bouchon local de l'API Search Console, pour tester les scripts de trafic sans
+credentials ni quota : service.searchanalytics().query(siteUrl=..., body=...).execute()
+répond depuis un CSV de trafic (URL, Clicks, Impressions, CTR, Average Position),
+par exemple data/traffic.csv du générateur de benchmarks/generate_crawl.py.
+
+- les requêtes bulk respectent rowLimit/startRow, lignes triées par clics
+  décroissants comme l'API ;
+- max_rows plafonne les lignes visibles en bulk (l'API n'expose pas toutes les
+  pages d'un gros site) : les pages au-delà ne sortent que par requête par URL ;
+- latency simule le temps de réponse, fail_urls des erreurs sur certaines URLs.
+
+    python get_google_trafic_data.py --stub traffic.csv --stub-max-rows 50000 -i pages.csv -o out.csv
+"""
+import csv
+import threading
+import time
+
+
+class StubSearchConsole:
+
+    def __init__(self, metrics, max_rows=None, latency=0.0, fail_urls=()):
+        # metrics : {url: {'clicks', 'impressions', 'ctr', 'position'}}
+        self.metrics = metrics
+        self.ranked = sorted(metrics, key=lambda url: (-metrics[url]['clicks'], url))
+        if max_rows is not None:
+            self.ranked = self.ranked[:max_rows]
+        self.latency = latency
+        self.fail_urls = set(fail_urls)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_csv(cls, path, **kwargs):
+        metrics = {}
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                metrics[row['URL']] = {
+                    'clicks': int(row['Clicks']),
+                    'impressions': int(row['Impressions']),
+                    'ctr': float(row['CTR']),
+                    'position': float(row['Average Position']),
+                }
+        return cls(metrics, **kwargs)
+
+    def searchanalytics(self):
+        return self
+
+    def query(self, siteUrl, body):
+        return _StubRequest(self, body)
+
+    def execute(self, body):
+        with self.lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        filters = [f for group in body.get('dimensionFilterGroups', []) for f in group['filters']]
+        if filters:
+            url = filters[0]['expression']
+            if url in self.fail_urls:
+                raise RuntimeError(f"Erreur simulée pour {url}")
+            pages = [url] if url in self.metrics else []
+        else:
+            start = body.get('startRow', 0)
+            pages = self.ranked[start:start + body['rowLimit']]
+        rows = [{'keys': [url], **self.metrics[url]} for url in pages[:body['rowLimit']]]
+        return {'rows': rows} if rows else {}
+
+
+class _StubRequest:
+
+    def __init__(self, stub, body):
+        self.stub = stub
+        self.body = body
+
+    def execute(self):
+        return self.stub.execute(self.body)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark on synthetic crawls (benchmarks/generate_crawl.py).
+Each scale is generated once under --data-dir, then src/main.py runs on it with
+--no-cache (every CSV parsed, every stage executed) in a fresh process. The
+per-step wall time, CPU time, peak RSS and rows come from the run profile
+(src/profiling.py); they are appended with the git revision to the --results CSV
+so runs can be compared over time.
+
+Usage:
+    python benchmarks/bench_pipeline.py --scales 10k,100k
+    python benchmarks/bench_pipeline.py --scales 1m --log-events 10000000 --no-charts
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from generate_crawl import SCALES, generate
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.join(BENCH_DIR, '..')
+RESULT_COLUMNS = ['bench_started', 'git_rev', 'scale', 'urls', 'log_events', 'run', 'kind', 'name', 'status',
+                  'wall_s', 'cpu_s', 'peak_rss_mb', 'rows']
+
+
+def git_rev():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def ensure_dataset(data_dir, scale, log_events, links_per_page, regenerate):
+    project_dir = os.path.join(data_dir, scale if log_events is None else f'{scale}-{log_events}')
+    config_path = os.path.join(project_dir, 'config', 'config.yaml')
+    if regenerate or not os.path.exists(config_path):
+        n_urls = SCALES[scale]
+        start = time.perf_counter()
+        rows = generate(project_dir, n_urls, log_events or n_urls * 10, links_per_page)
+        print(f"[{scale}] generated {sum(rows.values()):,} rows in {time.perf_counter() - start:.1f}s")
+    return project_dir, config_path
+
+
+def run_pipeline(project_dir, config_path, charts):
+    """
+    Runs the whole pipeline in a child process; returns (wall time, exit code).
+    The previous outputs, PageRank warm-start state included, are removed first
+    so every run starts cold.
+    """
+    shutil.rmtree(os.path.join(project_dir, 'reports'), ignore_errors=True)
+    command = [sys.executable, os.path.join(PROJECT_ROOT, 'src', 'main.py'), '--config', config_path, '--no-cache']
+    if not charts:
+        command.append('--no-charts')
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        print(completed.stderr[-2000:], file=sys.stderr)
+    return wall, completed.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the analysis pipeline on synthetic crawls')
+    parser.add_argument('--scales', default='10k', help=f"Comma-separated scales ({', '.join(SCALES)})")
+    parser.add_argument('--log-events', type=int, help='Bot log events per dataset (default: 10 per URL)')
+    parser.add_argument('--links-per-page', type=int, default=10, help='Average outgoing links per page')
+    parser.add_argument('--repeat', type=int, default=1, help='Pipeline runs per scale')
+    parser.add_argument('--no-charts', action='store_true', help='Skip chart rendering')
+    parser.add_argument('--regenerate', action='store_true', help='Regenerate the datasets even if present')
+    parser.add_argument('--data-dir', default=os.path.join(BENCH_DIR, 'data'), help='Generated datasets directory')
+    parser.add_argument('--results', default=os.path.join(BENCH_DIR, 'results', 'bench_pipeline.csv'),
+                        help='CSV the results are appended to')
+    args = parser.parse_args()
+
+    scales = [scale.strip() for scale in args.scales.split(',') if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"Unknown scales {unknown}; available: {', '.join(SCALES)}")
+
+    bench_started = datetime.now().isoformat(timespec='seconds')
+    rev = git_rev()
+    results = []
+    for scale in scales:
+        project_dir, config_path = ensure_dataset(args.data_dir, scale, args.log_events, args.links_per_page,
+                                                  args.regenerate)
+        log_events = args.log_events or SCALES[scale] * 10
+        for run in range(1, args.repeat + 1):
+            wall, returncode = run_pipeline(project_dir, config_path, not args.no_charts)
+            base = {'bench_started': bench_started, 'git_rev': rev, 'scale': scale, 'urls': SCALES[scale],
+                    'log_events': log_events, 'run': run}
+            profile_path = os.path.join(project_dir, 'reports', 'profile', 'run_profile.json')
+            steps = []
+            if os.path.exists(profile_path):
+                with open(profile_path, 'r') as f:
+                    steps = json.load(f)['steps']
+            failed = returncode != 0 or not steps or any(step['status'] == 'failed' for step in steps)
+            results.append({**base, 'kind': 'pipeline', 'name': 'end_to_end',
+                            'status': 'failed' if failed else 'ran', 'wall_s': round(wall, 3)})
+            if failed:
+                print(f"[{scale}] run {run} failed (exit code {returncode})")
+            for step in steps:
+                results.append({**base, **{key: step.get(key) for key in RESULT_COLUMNS if key in step}})
+            print(f"\n[{scale}] run {run}: {wall:.1f}s end to end")
+            print(f"  {'step':<34}{'wall (s)':>10}{'cpu (s)':>10}{'peak RSS (MB)':>15}{'rows':>12}")
+            for step in steps:
+                if step['kind'] in ('stage', 'load'):
+                    label = f"{step['kind']}:{step['name']}"
+                    if step['wall_s'] is None:
+                        print(f"  {label:<34}{step['status']:>10}")
+                        continue
+                    rows = '' if step['rows'] is None else f"{step['rows']:,}"
+                    print(f"  {label:<34}{step['wall_s']:>10.2f}{step['cpu_s']:>10.2f}"
+                          f"{step['peak_rss_mb'] or 0:>15.1f}{rows:>12}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    new_file = not os.path.exists(args.results)
+    with open(args.results, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(results)
+    print(f"\n{len(results)} result rows appended to {args.results}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark of orphan and zombie page detection: the former per-row
+Series.apply lambdas against the hashed anti-joins of src/segments.py.
+
+Usage:
+    python benchmarks/bench_segments.py --pages 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from segments import detect_orphan_pages, detect_zombie_pages  # noqa: E402
+
+
+def legacy_orphans(con, df):
+    edges_dst = con.execute('SELECT DISTINCT dst FROM edges').df()['dst']
+    linked_pages = set(edges_dst)
+    return df[df['url'].apply(lambda x: x not in linked_pages)]
+
+
+def legacy_zombies(df, orphan_pages):
+    return df[(df['PageRank'] < 0.0001) & (df['clicks'] < 10) & (df['hits'] < 10)
+              & (df['url'].apply(lambda x: x not in orphan_pages['url'].values))]
+
+
+def build_dataset(n_pages, links_per_page, seed=42):
+    rng = np.random.default_rng(seed)
+    urls = np.array([f'https://www.sortlist.com/page-{i}' for i in range(n_pages)], dtype=object)
+    df = pd.DataFrame({
+        'url': urls,
+        'PageRank': rng.random(n_pages) / (n_pages / 4),
+        'clicks': rng.integers(0, 20, n_pages),
+        'hits': rng.integers(0, 20, n_pages),
+    })
+    # Zipf-distributed destinations leave a realistic share of pages without inlinks
+    dst = (rng.zipf(1.3, n_pages * links_per_page) - 1) % n_pages
+    con = duckdb.connect(database=':memory:')
+    edges = pd.DataFrame({'src': urls[rng.integers(0, n_pages, len(dst))], 'dst': urls[dst]})
+    con.execute('CREATE TABLE edges AS SELECT * FROM edges')
+    return con, df
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark orphan/zombie detection')
+    parser.add_argument('--pages', type=int, default=20000, help='Number of pages')
+    parser.add_argument('--links-per-page', type=int, default=10, help='Average outgoing links per page')
+    args = parser.parse_args()
+
+    con, df = build_dataset(args.pages, args.links_per_page)
+    old_orphans, t_old_orphans = timed(legacy_orphans, con, df)
+    new_orphans, t_new_orphans = timed(detect_orphan_pages, con, df)
+    old_zombies, t_old_zombies = timed(legacy_zombies, df, old_orphans)
+    new_zombies, t_new_zombies = timed(detect_zombie_pages, df, new_orphans)
+    assert old_orphans.index.equals(new_orphans.index), 'orphan pages differ'
+    assert old_zombies.index.equals(new_zombies.index), 'zombie pages differ'
+
+    print(f"{args.pages} pages, {len(new_orphans)} orphans, {len(new_zombies)} zombies")
+    print(f"{'step':<10}{'legacy (s)':>12}{'vectorized (s)':>16}{'speedup':>10}")
+    for step, t_old, t_new in [('orphans', t_old_orphans, t_new_orphans), ('zombies', t_old_zombies, t_new_zombies)]:
+        print(f"{step:<10}{t_old:>12.3f}{t_new:>16.3f}{t_old / t_new:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
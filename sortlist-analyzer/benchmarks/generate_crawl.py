@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Synthetic crawl generator: writes crawl-shaped pages, edges, categorized,
+traffic, logs_events, backlinks and PageSpeed CSVs (same columns as the real
+exports, see src/schemas.py) plus a config/config.yaml pointing at them, so the
+pipeline runs on the generated project as is:
+
+    python benchmarks/generate_crawl.py --scale 100k --out benchmarks/data/100k
+    python src/main.py --config benchmarks/data/100k/config/config.yaml
+
+Every file is produced by a DuckDB COPY over range(), with values drawn from
+hash(row, salt, seed): the output is identical from run to run and the 1M URL /
+10M log event scale is written in seconds without holding it in memory.
+"""
+import argparse
+import os
+import sys
+import time
+
+import duckdb
+import yaml
+
+PROJECT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Number of URLs per --scale preset; log events default to 10 per URL
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+BASE_URL = 'https://www.sortlist.com'
+SERVICES = ['seo', 'design', 'advertising', 'web-development', 'branding', 'social-media-marketing',
+            'content-marketing', 'app-development', 'video-production', 'public-relations',
+            'e-commerce', 'digital-strategy', 'ux-design', 'email-marketing', 'photography', '3d-design']
+CITIES = ['paris-fr', 'berlin-de', 'london-gb', 'madrid-es', 'barcelona-es', 'amsterdam-nl', 'brussels-be',
+          'new-york-us', 'cape-town-za', 'dubai-ae', 'melbourne-au', 'dublin-ie', 'milan-it', 'lisbon-pt',
+          'singapore', 'dubai', 'paris', 'berlin']
+BOTS = ['Googlebot', 'Googlebot Smartphone', 'Googlebot Image', 'Bingbot', 'AdsBot-Google']
+LINK_POSITIONS = ['Contenu', 'Contenu', 'Contenu', 'Header', 'Footer', 'Footer', 'Sidebar', 'Menu', 'Menu']
+
+# URL shapes (cumulative share in %, category) following Crawl/Scripts/categorize_urls.py
+URL_SHAPES = [
+    (30, 'Agency'),            # /agency/<name>
+    (50, 'Landing'),           # /s/<service>/<city>[?page=n]
+    (58, 'Landing'),           # /<service>/<city>[?page=n]
+    (63, 'Landing Location'),  # /l/<city>-<n>
+    (68, 'Service Landing'),   # /<service>-<n>
+    (83, 'Blog'),              # /blog/<post>
+    (85, 'Blog Category'),     # /blog/category/<service>
+    (88, 'Datahub'),           # /datahub/reports/<n>
+    (94, 'Project'),           # /project/<n>
+    (100, 'Event'),            # /event/<n>
+]
+
+
+def _list_sql(values):
+    return '[' + ', '.join("'" + v.replace("'", "''") + "'" for v in values) + ']'
+
+
+def _setup(con, seed: int) -> None:
+    # rnd(i, salt): uniform in [0, 1) from the row number, stable across runs and threads
+    con.execute(f"CREATE MACRO rnd(i, salt) AS (hash(i, salt, {seed}) % 1000000)::DOUBLE / 1000000")
+    con.execute(f"CREATE MACRO pick(choices, i, salt) AS list_element(choices, 1 + CAST(floor(rnd(i, salt) * len(choices)) AS INTEGER))")
+
+
+def _title(slug: str) -> str:
+    return ' '.join(part.title() for part in slug.split('-'))
+
+
+def _create_lookups(con) -> None:
+    # Service labels and city location/country, as categorize_urls.py derives them
+    services = [(k, slug, _title(slug)) for k, slug in enumerate(SERVICES)]
+    cities = []
+    for k, slug in enumerate(CITIES):
+        parts = slug.split('-')
+        if len(parts) > 1 and len(parts[-1]) == 2:
+            cities.append((k, slug, ' '.join(p.title() for p in parts[:-1]), parts[-1].upper()))
+        else:
+            cities.append((k, slug, slug.title(), ''))
+    con.execute("CREATE TABLE services (k INTEGER, slug VARCHAR, title VARCHAR)")
+    con.executemany("INSERT INTO services VALUES (?, ?, ?)", services)
+    con.execute("CREATE TABLE cities (k INTEGER, slug VARCHAR, location VARCHAR, country VARCHAR)")
+    con.executemany("INSERT INTO cities VALUES (?, ?, ?, ?)", cities)
+
+
+def _create_urls(con, n_urls: int) -> None:
+    """
+    urls(id, url, category, label, location, country, depth): id 0 is the home page,
+    popular ids (low numbers) sit close to it.
+    """
+    _create_lookups(con)
+    shape_case = ' '.join(f"WHEN bucket < {bound} THEN {k}" for k, (bound, _) in enumerate(URL_SHAPES))
+    category_case = ' '.join(f"WHEN {k} THEN '{category}'" for k, (_, category) in enumerate(URL_SHAPES))
+    n_services, n_cities = len(SERVICES), len(CITIES)
+    con.execute(f"""
+        CREATE TABLE urls AS
+        WITH raw AS (
+            SELECT
+                range as id,
+                CASE WHEN range = 0 THEN -1 ELSE CASE {shape_case} END END as shape,
+                CAST(range % {n_services} AS INTEGER) as service_k,
+                CAST((range // {n_services}) % {n_cities} AS INTEGER) as city_k,
+                range // {n_services * n_cities} as page
+            FROM (SELECT range, CAST(floor(rnd(range, 1) * 100) AS INTEGER) as bucket FROM range({n_urls}))
+        )
+        SELECT
+            r.id,
+            '{BASE_URL}/' || CASE r.shape
+                WHEN -1 THEN ''
+                WHEN 0 THEN 'agency/agency-' || r.id
+                WHEN 1 THEN 's/' || s.slug || '/' || c.slug || CASE WHEN r.page > 0 THEN '?page=' || r.page ELSE '' END
+                WHEN 2 THEN s.slug || '/' || c.slug || CASE WHEN r.page > 0 THEN '?page=' || r.page ELSE '' END
+                WHEN 3 THEN 'l/' || c.slug || '-' || r.id
+                WHEN 4 THEN s.slug || '-' || r.id
+                WHEN 5 THEN 'blog/' || s.slug || '-guide-' || r.id
+                WHEN 6 THEN 'blog/category/' || s.slug || '-' || r.id
+                WHEN 7 THEN 'datahub/reports/' || r.id
+                WHEN 8 THEN 'project/project-' || r.id
+                ELSE 'event/' || s.slug || '-event-' || r.id
+            END as url,
+            CASE r.shape WHEN -1 THEN 'HomePage' {category_case} END as category,
+            CASE
+                WHEN r.shape IN (1, 2, 4, 6) THEN s.title
+                WHEN r.shape = 5 THEN 'Blog Article'
+                WHEN r.shape = 7 THEN 'Datahub'
+                WHEN r.shape = 8 THEN 'Project'
+                WHEN r.shape = 9 THEN s.title || ' Event'
+                ELSE ''
+            END as label,
+            CASE WHEN r.shape IN (1, 2, 3) THEN c.location WHEN r.shape = 0 THEN '' ELSE 'Global' END as location,
+            CASE WHEN r.shape IN (1, 2, 3) THEN c.country ELSE '' END as country,
+            CASE WHEN r.shape = -1 THEN 0 WHEN r.id < 100 THEN 1 ELSE 2 + CAST(floor(rnd(r.id, 2) * 6) AS INTEGER) END as depth
+        FROM raw r
+        JOIN services s ON s.k = r.service_k
+        JOIN cities c ON c.k = r.city_k
+    """)
+
+
+def _copy(con, query: str, path: str, delimiter: str = ',') -> int:
+    # COPY returns the number of rows written
+    return con.execute(f"COPY ({query}) TO '{path}' (HEADER, DELIMITER '{delimiter}')").fetchone()[0]
+
+
+def generate(out_dir: str, n_urls: int, n_log_events: int, links_per_page: int = 10,
+             n_backlinks: int = None, pagespeed_sample: int = 500, seed: int = 42) -> dict:
+    """
+    Writes the synthetic project to out_dir (data/*.csv + config/config.yaml).
+    Returns {file: rows}.
+    """
+    data_dir = os.path.join(out_dir, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(os.path.join(out_dir, 'config'), exist_ok=True)
+    n_edges = n_urls * links_per_page
+    n_backlinks = n_urls // 2 if n_backlinks is None else n_backlinks
+    con = duckdb.connect()
+    _setup(con, seed)
+    _create_urls(con, n_urls)
+    # Popular (low id) pages draw most links, hits, clicks and backlinks
+    skewed_id = f"CAST(floor(pow(rnd(range, {{salt}}), 3) * {n_urls}) AS BIGINT)"
+    rows = {}
+
+    rows['pages.csv'] = _copy(con, f"""
+        SELECT
+            url as "Adresse",
+            'text/html; charset=utf-8' as "Type de contenu",
+            CASE WHEN rnd(id, 10) < 0.9 THEN 200 WHEN rnd(id, 10) < 0.96 THEN 301 ELSE 404 END as "Code HTTP",
+            CASE WHEN rnd(id, 10) < 0.9 THEN 'OK' WHEN rnd(id, 10) < 0.96 THEN 'Moved Permanently' ELSE 'Not Found' END as "Statut",
+            CASE WHEN rnd(id, 10) < 0.85 THEN 'Indexable' ELSE 'Non indexable' END as "Indexabilité",
+            CAST(floor(pow(1 - rnd(id, 11), 4) * 500) AS INTEGER) as "Liens entrants",
+            10 + CAST(floor(rnd(id, 12) * 120) AS INTEGER) as "Liens sortants",
+            depth as "Crawl profondeur",
+            CAST(floor(rnd(id, 13) * rnd(id, 14) * 4000) AS INTEGER) as "Nombre de mots"
+        FROM urls ORDER BY id
+    """, os.path.join(data_dir, 'pages.csv'))
+
+    rows['edges.csv'] = _copy(con, f"""
+        SELECT
+            'Hyperlien' as "Type",
+            s.url as "Source",
+            CASE WHEN rnd(e.range, 22) < 0.03 THEN 'https://www.linkedin.com/company/sortlist' ELSE d.url END as "Destination",
+            'true' as "Suivre",
+            pick({_list_sql(LINK_POSITIONS)}, e.range, 23) as "Position du lien"
+        FROM (
+            SELECT range, CAST(floor(rnd(range, 20) * {n_urls}) AS BIGINT) as src, {skewed_id.format(salt=21)} as dst
+            FROM range({n_edges})
+        ) e
+        JOIN urls s ON s.id = e.src
+        JOIN urls d ON d.id = e.dst
+    """, os.path.join(data_dir, 'edges.csv'))
+
+    rows['categorized.csv'] = _copy(con, """
+        SELECT
+            url as "Adresse", category as "Category", label as "Label", location as "Location",
+            country as "Country", CASE WHEN contains(url, '?page=') THEN 'Yes' ELSE 'No' END as "Pagination"
+        FROM urls ORDER BY id
+    """, os.path.join(data_dir, 'categorized.csv'))
+
+    # About 60% of the pages get Search Console rows
+    rows['traffic.csv'] = _copy(con, """
+        SELECT
+            url as "URL",
+            clicks as "Clicks",
+            impressions as "Impressions",
+            CASE WHEN impressions > 0 THEN clicks / impressions ELSE 0 END as "CTR",
+            round(1 + rnd(id, 33) * 60, 1) as "Average Position"
+        FROM (
+            SELECT id, url,
+                CAST(floor(pow(1 - rnd(id, 31), 12) * 2000) AS INTEGER) as clicks,
+                CAST(floor(pow(1 - rnd(id, 31), 12) * 2000) AS INTEGER) * 20 + CAST(floor(rnd(id, 32) * 300) AS INTEGER) as impressions
+            FROM urls WHERE rnd(id, 30) < 0.6
+        ) ORDER BY id
+    """, os.path.join(data_dir, 'traffic.csv'))
+
+    # 30 days of bot hits; a share of the crawl goes to _next/image URLs
+    rows['logs_events.csv'] = _copy(con, f"""
+        SELECT
+            CASE WHEN rnd(l.range, 41) < 0.04 THEN '{BASE_URL}/_next/image?url=%2Fimg%2F' || (l.range % 997) || '.png&w=640'
+                 ELSE u.url END as event_url,
+            pick({_list_sql(BOTS)}, l.range, 42) as event_bot_name,
+            TIMESTAMP '2025-04-05 00:00:00' + to_seconds(CAST(floor(rnd(l.range, 43) * 30 * 86400) AS BIGINT)) as event_datetime,
+            CASE WHEN rnd(l.range, 44) < 0.88 THEN 200 WHEN rnd(l.range, 44) < 0.94 THEN 301
+                 WHEN rnd(l.range, 44) < 0.99 THEN 404 ELSE 500 END as event_status_code
+        FROM (SELECT range, {skewed_id.format(salt=40)} as target FROM range({n_log_events})) l
+        JOIN urls u ON u.id = l.target
+    """, os.path.join(data_dir, 'logs_events.csv'))
+
+    rows['backlinks.csv'] = _copy(con, f"""
+        SELECT
+            'https://ref-' || CAST(floor(rnd(b.range, 51) * 5000) AS INTEGER) || '.example.com/post' as "SourceURL",
+            u.url as "TargetURL",
+            'follow' as "LinkType"
+        FROM (SELECT range, {skewed_id.format(salt=50)} as target FROM range({n_backlinks})) b
+        JOIN urls u ON u.id = b.target
+    """, os.path.join(data_dir, 'backlinks.csv'), delimiter=';')
+
+    # PageSpeed sample: a few failed API calls exported as 'API Error'
+    metrics = {'Performance_Score': 100, 'FCP': 6000, 'LCP': 15000, 'SI': 9000, 'TTI': 20000, 'TBT': 1500, 'CLS': 1}
+    metric_columns = ',\n'.join(
+        f"CASE WHEN rnd(id, 60) < 0.03 THEN 'API Error' ELSE CAST(round(rnd(id, {61 + k + 10 * p}) * {scale}) AS VARCHAR) END as \"{platform}_{metric}\""
+        for p, platform in enumerate(['Mobile', 'Desktop']) for k, (metric, scale) in enumerate(metrics.items()))
+    rows['pagespeed_results.csv'] = _copy(con, f"""
+        SELECT url as "URL", category as "Category", {metric_columns}
+        FROM urls WHERE id < {pagespeed_sample} ORDER BY id
+    """, os.path.join(data_dir, 'pagespeed_results.csv'))
+    con.close()
+
+    _write_config(out_dir)
+    return rows
+
+
+def _write_config(out_dir: str) -> None:
+    """
+    Project config for the generated data: the repository config with the source
+    files, caches and outputs redirected into out_dir.
+    """
+    with open(os.path.join(PROJECT_ROOT, 'config', 'config.yaml'), 'r') as f:
+        config = yaml.safe_load(f)
+    config['data_dir'] = 'data/'
+    config['csv_files'] = {
+        'pages': 'pages.csv',
+        'edges': 'edges.csv',
+        'categories': 'categorized.csv',
+        'traffic': 'traffic.csv',
+        'logs': 'logs_events.csv',
+    }
+    config['backlinks_csv_path'] = 'data/backlinks.csv'
+    # pagespeed_output_csv is resolved against the script's project root: give an absolute path
+    config['pagespeed_output_csv'] = os.path.abspath(os.path.join(out_dir, 'data', 'pagespeed_results.csv'))
+    with open(os.path.join(out_dir, 'config', 'config.yaml'), 'w') as f:
+        yaml.safe_dump(config, f, sort_keys=False, allow_unicode=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic sortlist crawl')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k', help='URL count preset')
+    parser.add_argument('--urls', type=int, help='Number of URLs (overrides --scale)')
+    parser.add_argument('--log-events', type=int, help='Number of bot log events (default: 10 per URL)')
+    parser.add_argument('--links-per-page', type=int, default=10, help='Average outgoing links per page')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--out', required=True, help='Output project directory')
+    args = parser.parse_args()
+
+    n_urls = args.urls or SCALES[args.scale]
+    n_log_events = args.log_events or n_urls * 10
+    start = time.perf_counter()
+    rows = generate(args.out, n_urls, n_log_events, args.links_per_page, seed=args.seed)
+    for name, count in rows.items():
+        print(f"{name:<24}{count:>12,}")
+    print(f"Generated in {time.perf_counter() - start:.1f}s: {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
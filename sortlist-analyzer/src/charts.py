@@ -0,0 +1,376 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import matplotlib
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+from profiling import PROFILER, measure_start, measure_since
+
+# Chart registry: name -> (PNG file name, prepare, render).
+# prepare(inputs) runs in the main process and reduces the analysis frames to
+# the small slice the chart needs (None skips the chart); render(data, path) is
+# a pure function drawing that slice with the object-oriented Agg API, so it can
+# run in a worker process.
+CHARTS: Dict[str, Dict[str, Any]] = {}
+
+def register_chart(name: str, filename: str, prepare: Callable[[Dict[str, Any]], Any]):
+    def decorator(render: Callable[[Any, str], None]):
+        CHARTS[name] = {'filename': filename, 'prepare': prepare, 'render': render}
+        return render
+    return decorator
+
+def _new_figure(figsize, **subplot_kw):
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(**subplot_kw)
+    return fig, ax
+
+def _bar_chart(series: pd.Series, path: str, title: str, xlabel: str, ylabel: str,
+               figsize=(10, 5), palette: Optional[str] = None, rotate: bool = True) -> None:
+    fig, ax = _new_figure(figsize)
+    labels = [str(label) for label in series.index]
+    if palette:
+        sns.barplot(x=labels, y=series.values, hue=labels, palette=palette, legend=False, ax=ax)
+    else:
+        sns.barplot(x=labels, y=series.values, ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    if rotate:
+        ax.tick_params(axis='x', labelrotation=45)
+        for label in ax.get_xticklabels():
+            label.set_horizontalalignment('right')
+    fig.tight_layout()
+    fig.savefig(path)
+
+def _category_plot(df: pd.DataFrame, top_n: int = 10) -> pd.Series:
+    """
+    Category used as scatter hue: the top_n categories by page count, 'Other' for the rest.
+    """
+    if 'category' not in df.columns:
+        return pd.Series('N/A', index=df.index)
+    if df['category'].nunique() <= top_n:
+        return df['category']
+    top_categories = df['category'].value_counts().nlargest(top_n).index
+    return df['category'].where(df['category'].isin(top_categories), 'Other')
+
+# --- Correlation heatmap ---
+
+def _prepare_heatmap(inputs):
+    corr_matrix = inputs['correlations']['pearson'].round(2)
+    if len(corr_matrix.columns) < 2:
+        logging.warning("Not enough columns available to generate the correlation heatmap.")
+        return None
+    return corr_matrix
+
+@register_chart('correlation_heatmap', 'Correlation_heatmap.png', _prepare_heatmap)
+def render_heatmap(corr_matrix: pd.DataFrame, path: str) -> None:
+    size = len(corr_matrix.columns)
+    fig, ax = _new_figure((max(8, size), max(6, int(size * 0.8))))
+    mask = np.triu(np.ones_like(corr_matrix, dtype=bool))
+    sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', fmt='.2f', mask=mask, center=0, square=True,
+                linewidths=.5, cbar_kws={"shrink": .8}, ax=ax)
+    ax.set_title('Heatmap of Main Correlations')
+    # Drop the empty last column / first row labels of the masked triangle
+    xticklabels = ax.get_xticklabels()
+    yticklabels = ax.get_yticklabels()
+    if len(xticklabels) > 0:
+        xticklabels[-1].set_text('')
+        ax.set_xticklabels(xticklabels, rotation=45, ha="right")
+    if len(yticklabels) > 0:
+        yticklabels[0].set_text('')
+        ax.set_yticklabels(yticklabels, rotation=0)
+    fig.tight_layout()
+    fig.savefig(path)
+
+# --- Bar charts ---
+
+@register_chart('deep_pages', 'DeepPages_barplot.png',
+                lambda inputs: inputs['df']['crawl_depth'].value_counts().sort_index())
+def render_depth_counts(depth_counts: pd.Series, path: str) -> None:
+    _bar_chart(depth_counts, path, 'Page Count by Crawl Depth', 'Crawl Depth', 'Number of Pages',
+               figsize=(8, 5), rotate=False)
+
+def _top_clicks(column: str, n: int):
+    def prepare(inputs):
+        df = inputs['df']
+        if column not in df.columns or 'clicks' not in df.columns:
+            logging.warning(f"'{column}' or 'clicks' columns missing for the top {n} {column} chart.")
+            return None
+        top = df.groupby(column)['clicks'].sum().sort_values(ascending=False).head(n)
+        if top.empty:
+            logging.warning(f"Insufficient or empty {column} data for the top {n} {column} chart.")
+            return None
+        return top
+    return prepare
+
+@register_chart('top10_label_traffic', 'Top10_Label_Traffic.png', _top_clicks('label', 10))
+def render_top_labels(top_labels: pd.Series, path: str) -> None:
+    _bar_chart(top_labels, path, 'Top 10 Labels by Traffic (clicks)', 'Label', 'Total Clicks')
+
+@register_chart('top10_category_traffic', 'Top10_Category_Traffic.png', _top_clicks('category', 10))
+def render_top_categories(top_cats: pd.Series, path: str) -> None:
+    _bar_chart(top_cats, path, 'Top 10 Categories by Traffic (clicks)', 'Category', 'Total Clicks')
+
+@register_chart('top15_location_traffic', 'Top15_Location_Traffic.png', _top_clicks('location', 15))
+def render_top_locations(top_locations: pd.Series, path: str) -> None:
+    _bar_chart(top_locations, path, 'Top 15 Locations by Traffic (clicks)', 'Location', 'Total Clicks',
+               figsize=(12, 7), palette='viridis')
+
+@register_chart('top15_country_traffic', 'Top15_Country_Traffic.png', _top_clicks('country', 15))
+def render_top_countries(top_countries: pd.Series, path: str) -> None:
+    _bar_chart(top_countries, path, 'Top 15 Countries by Traffic (clicks)', 'Country', 'Total Clicks',
+               figsize=(12, 7), palette='mako')
+
+def _segment_categories(segment: str):
+    def prepare(inputs):
+        segment_df = inputs.get(segment)
+        if segment_df is None or segment_df.empty:
+            return None
+        return segment_df['category'].value_counts().head(10)
+    return prepare
+
+@register_chart('opportunities_by_category', 'Opportunities_count_Category.png', _segment_categories('opportunities'))
+def render_opportunities(counts: pd.Series, path: str) -> None:
+    _bar_chart(counts, path, 'Opportunities: Page Count by Category (Top 10)', 'Category', 'Number of Pages')
+
+@register_chart('zombies_by_category', 'Zombies_count_Category.png', _segment_categories('zombies'))
+def render_zombies(counts: pd.Series, path: str) -> None:
+    _bar_chart(counts, path, 'Zombies: Page Count by Category (Top 10)', 'Category', 'Number of Pages')
+
+@register_chart('highctr_lowimp_by_category', 'HighCTR_LowImpressions_count_Category.png',
+                _segment_categories('highctr_lowimp'))
+def render_highctr_lowimp(counts: pd.Series, path: str) -> None:
+    _bar_chart(counts, path, 'High CTR & Low Impressions: Page Count by Category (Top 10)', 'Category',
+               'Number of Pages')
+
+# --- Scatter plots ---
+
+# Above max_points pages, scatter charts switch to a density grid ('density': 2D
+# histogram on log axes) or to a sample stratified by category ('sample', at
+# least min_per_category points per category), so their cost stays bounded.
+SCATTER_DEFAULTS = {'max_points': 20000, 'mode': 'density', 'gridsize': 60, 'min_per_category': 50}
+
+def _stratified_sample(data: pd.DataFrame, max_points: int, min_per_category: int) -> pd.DataFrame:
+    """
+    Random sample of about max_points rows, proportional per category_plot with a floor.
+    """
+    rng = np.random.default_rng(0)
+    shuffled = data.iloc[rng.permutation(len(data))]
+    sizes = shuffled.groupby('category_plot', observed=True)['category_plot'].transform('size')
+    quota = np.minimum(sizes, np.maximum(min_per_category, np.round(sizes * max_points / len(data))))
+    position = shuffled.groupby('category_plot', observed=True).cumcount()
+    return shuffled[position < quota].sort_index()
+
+def _density_grid(x: pd.Series, y: pd.Series, gridsize: int) -> Dict[str, Any]:
+    """
+    Page counts on a gridsize x gridsize grid of log-spaced bins (points <= 0 cannot be drawn on log axes).
+    """
+    keep = (x > 0) & (y > 0)
+    counts, xedges, yedges = np.histogram2d(np.log10(x[keep].to_numpy(dtype=float)),
+                                            np.log10(y[keep].to_numpy(dtype=float)), bins=gridsize)
+    return {'counts': counts, 'xedges': 10 ** xedges, 'yedges': 10 ** yedges, 'points': int(keep.sum())}
+
+def _scatter_slice(inputs: Dict[str, Any], data: pd.DataFrame, x: str, y: str) -> Dict[str, Any]:
+    settings = {**SCATTER_DEFAULTS, **(inputs.get('scatter') or {})}
+    if len(data) <= settings['max_points']:
+        return {'mode': 'points', 'data': data}
+    if settings['mode'] == 'sample':
+        sample = _stratified_sample(data, settings['max_points'], settings['min_per_category'])
+        logging.info(f"{x} vs {y}: {len(sample)} of {len(data)} pages drawn (stratified sample)")
+        return {'mode': 'points', 'data': sample, 'total': len(data)}
+    logging.info(f"{x} vs {y}: {len(data)} pages drawn as a density grid")
+    return {'mode': 'density', **_density_grid(data[x], data[y], settings['gridsize'])}
+
+def _scatter_chart(scatter: Dict[str, Any], path: str, x: str, y: str, title: str, xlabel: str, ylabel: str) -> None:
+    fig, ax = _new_figure((12, 7))
+    if scatter['mode'] == 'density':
+        counts = np.ma.masked_equal(scatter['counts'].T, 0)
+        mesh = ax.pcolormesh(scatter['xedges'], scatter['yedges'], counts, cmap='viridis',
+                             norm=LogNorm(vmin=1, vmax=max(counts.max(), 1)))
+        fig.colorbar(mesh, ax=ax, label='Number of Pages')
+        title = f"{title.split(' (')[0]} (density, {scatter['points']} pages)"
+    else:
+        sns.scatterplot(data=scatter['data'], x=x, y=y, hue='category_plot', alpha=0.6, s=50, ax=ax)
+        ax.legend(title='Category', bbox_to_anchor=(1.05, 1), loc='upper left')
+        if 'total' in scatter:
+            title = f"{title} - sample of {len(scatter['data'])}/{scatter['total']} pages"
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    fig.tight_layout(rect=[0, 0, 0.85, 1] if scatter['mode'] == 'points' else None)
+    fig.savefig(path)
+
+def _prepare_pagerank_clicks(inputs):
+    df = inputs['df']
+    if df.empty or 'PageRank' not in df.columns or 'clicks' not in df.columns:
+        logging.warning("Insufficient data for PageRank vs Clicks scatter plot.")
+        return None
+    data = pd.DataFrame({'PageRank': df['PageRank'], 'clicks': df['clicks'], 'category_plot': _category_plot(df)})
+    return _scatter_slice(inputs, data, 'PageRank', 'clicks')
+
+@register_chart('pagerank_vs_clicks', 'PageRank_vs_Clicks_by_Category.png', _prepare_pagerank_clicks)
+def render_pagerank_clicks(scatter: Dict[str, Any], path: str) -> None:
+    _scatter_chart(scatter, path, 'PageRank', 'clicks', 'PageRank vs Clicks (colored by Category)',
+                   'PageRank', 'Number of Clicks')
+
+def _prepare_wordcount_clicks(inputs):
+    df = inputs['df']
+    if df.empty or 'word_count' not in df.columns or 'clicks' not in df.columns:
+        logging.warning("Insufficient data for Word Count vs Clicks scatter plot.")
+        return None
+    keep = (df['word_count'] > 0) & (df['clicks'] > 0)
+    if not keep.any():
+        logging.warning("Filtered data insufficient (word_count > 0, clicks > 0) for Word Count vs Clicks scatter plot.")
+        return None
+    data = pd.DataFrame({'word_count': df['word_count'][keep], 'clicks': df['clicks'][keep],
+                         'category_plot': _category_plot(df)[keep]})
+    return _scatter_slice(inputs, data, 'word_count', 'clicks')
+
+@register_chart('wordcount_vs_clicks', 'WordCount_vs_Clicks_by_Category.png', _prepare_wordcount_clicks)
+def render_wordcount_clicks(scatter: Dict[str, Any], path: str) -> None:
+    _scatter_chart(scatter, path, 'word_count', 'clicks', 'Word Count vs Clicks (colored by Category)',
+                   'Word Count (log scale)', 'Number of Clicks (log scale)')
+
+# --- PageSpeed radar charts ---
+
+RADAR_EXCLUDED_CATEGORIES = ['Other', 'Blog Category']
+RADAR_MAX_CATEGORIES = 8
+
+def _prepare_radar(inputs):
+    """
+    Min-max normalized PageSpeed metrics (inverted: lower is better) averaged per category.
+    """
+    df_pagespeed_raw = inputs.get('pagespeed_raw')
+    if df_pagespeed_raw is None or df_pagespeed_raw.empty:
+        logging.info("PageSpeed data not loaded or empty, radar charts will not be generated.")
+        return None
+    df_ps = df_pagespeed_raw.rename(columns=lambda col: col.lower().strip())
+    if 'category' not in df_ps.columns:
+        logging.warning("Column 'category' not found in PageSpeed data, radar charts will not be generated.")
+        return None
+    df_ps = df_ps[~df_ps['category'].isin(RADAR_EXCLUDED_CATEGORIES)]
+    metrics = ['lcp', 'tbt', 'cls', 'fcp', 'speed_index']
+    if 'mobile_speed_index' not in df_ps.columns or 'desktop_speed_index' not in df_ps.columns:
+        metrics = ['lcp', 'tbt', 'cls', 'fcp']
+    metric_cols = [f'{platform}_{m}' for platform in ['mobile', 'desktop'] for m in metrics]
+    if not all(col in df_ps.columns for col in metric_cols):
+        logging.warning(f"Missing PageSpeed columns for radar charts. Expected: {metric_cols}. Found: {list(df_ps.columns)}")
+        return None
+    values = df_ps[metric_cols].apply(pd.to_numeric, errors='coerce')
+    values['category'] = df_ps['category']
+    values = values.dropna()
+    if values.empty:
+        logging.warning("Not enough valid PageSpeed data after cleaning to generate radar charts.")
+        return None
+    spread = values[metric_cols].max() - values[metric_cols].min()
+    scaled = (values[metric_cols] - values[metric_cols].min()) / spread.where(spread != 0)
+    # Constant metrics get a neutral 0.5; every radar metric is "lower is better"
+    scaled = 1 - scaled.fillna(0.5)
+    scaled['category'] = values['category']
+    radar_data = scaled.groupby('category').mean().reset_index()
+    if len(radar_data) > RADAR_MAX_CATEGORIES:
+        top_categories = values['category'].value_counts().nlargest(RADAR_MAX_CATEGORIES).index
+        radar_data = radar_data[radar_data['category'].isin(top_categories)].reset_index(drop=True)
+        logging.info(f"Radar charts limited to {RADAR_MAX_CATEGORIES} main categories.")
+    return {'metrics': metrics, 'radar_data': radar_data}
+
+def _render_radar(data: Dict[str, Any], path: str, platform: str, title: str) -> None:
+    metrics, radar_data = data['metrics'], data['radar_data']
+    angles = np.linspace(0, 2 * np.pi, len(metrics), endpoint=False).tolist() + [0]
+    colors = matplotlib.colormaps['tab10'].resampled(RADAR_MAX_CATEGORIES)
+    fig, ax = _new_figure((9, 9), polar=True)
+    ax.set_theta_offset(np.pi / 2)
+    ax.set_theta_direction(-1)
+    ax.set_xticks(angles[:-1], [m.upper() for m in metrics])
+    ax.set_yticks(np.linspace(0, 1, 5))
+    ax.set_yticklabels([f"{i*100:.0f}" for i in np.linspace(0, 1, 5)])
+    ax.set_ylim(0, 1)
+    for i, row in radar_data.iterrows():
+        values = row[[f'{platform}_{m}' for m in metrics]].astype(float).tolist()
+        values += values[:1]
+        ax.plot(angles, values, color=colors(i), linewidth=2.5, linestyle='solid', label=row['category'])
+        ax.fill(angles, values, color=colors(i), alpha=0.35)
+    ax.set_title(title, size=14, y=1.1)
+    ax.legend(loc='upper right', bbox_to_anchor=(1.3, 1.1))
+    fig.subplots_adjust(right=0.75)
+    fig.savefig(path, bbox_inches='tight')
+
+@register_chart('radar_mobile', 'Radar_PageSpeed_Mobile_ByCategory.png', _prepare_radar)
+def render_radar_mobile(data: Dict[str, Any], path: str) -> None:
+    _render_radar(data, path, 'mobile', 'Mobile PageSpeed Performance by Category (Normalized Sample)')
+
+@register_chart('radar_desktop', 'Radar_PageSpeed_Desktop_ByCategory.png', _prepare_radar)
+def render_radar_desktop(data: Dict[str, Any], path: str) -> None:
+    _render_radar(data, path, 'desktop', 'Desktop PageSpeed Performance by Category (Normalized Sample)')
+
+# --- Pipeline ---
+
+def _render_chart(name: str, data: Any, path: str) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Worker entry point: renders one chart, returns an error message instead of
+    raising, and the wall/CPU time and peak RSS measured in the worker.
+    """
+    start = measure_start()
+    try:
+        CHARTS[name]['render'](data, path)
+        error = None
+    except Exception as e:
+        error = str(e)
+    return error, measure_since(start)
+
+def _data_rows(data: Any) -> Optional[int]:
+    # Rows of the prepared slice (sum over its frames for multi-frame charts)
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return len(data)
+    if isinstance(data, dict):
+        sizes = [len(value) for value in data.values() if isinstance(value, (pd.DataFrame, pd.Series))]
+        return sum(sizes) if sizes else None
+    return None
+
+def render_charts(inputs: Dict[str, Any], charts_dir: str, names: Optional[List[str]] = None,
+                  workers: Optional[int] = None) -> Dict[str, str]:
+    """
+    Prepares the selected charts (all by default) in this process and renders them
+    in a process pool of `workers` processes (inline when workers <= 1).
+    Returns {chart name: PNG path} for the charts written.
+    """
+    unknown = [name for name in (names or []) if name not in CHARTS]
+    if unknown:
+        logging.error(f"Unknown charts {unknown}; available: {sorted(CHARTS)}")
+    selected = [name for name in CHARTS if names is None or name in names]
+    os.makedirs(charts_dir, exist_ok=True)
+    jobs = {}
+    for name in selected:
+        try:
+            data = CHARTS[name]['prepare'](inputs)
+        except Exception as e:
+            logging.error(f"Error preparing chart {name}: {e}")
+            continue
+        if data is not None:
+            jobs[name] = (data, os.path.join(charts_dir, CHARTS[name]['filename']))
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        results = {name: _render_chart(name, data, path) for name, (data, path) in jobs.items()}
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {name: pool.submit(_render_chart, name, data, path) for name, (data, path) in jobs.items()}
+            results = {name: future.result() for name, future in futures.items()}
+    written = {}
+    for name, (data, path) in jobs.items():
+        error, stats = results[name]
+        PROFILER.record('chart', name, 'failed' if error else 'ran', rows=_data_rows(data), **stats)
+        if error:
+            logging.error(f"Error rendering chart {name}: {error}")
+        else:
+            written[name] = path
+    logging.info(f"{len(written)}/{len(selected)} charts rendered in {charts_dir} ({max(workers, 1)} worker(s))")
+    return written
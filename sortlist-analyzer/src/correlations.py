@@ -0,0 +1,159 @@
+import logging
+import warnings
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+from typing import Dict, List, Optional, Tuple
+
+# Metric columns of the correlation block, in heatmap order; missing ones are skipped
+CORRELATION_METRICS = ['PageRank', 'Weighted_PageRank', 'clicks', 'hits', 'crawl_depth', 'word_count',
+                       'external_backlinks_count', 'combined_performance_score']
+
+METRIC_LABELS = {
+    'clicks': 'Traffic (clicks)',
+    'hits': 'Hits (logs)',
+    'word_count': 'Nombre de mots',
+    'crawl_depth': 'Crawl profondeur',
+    'external_backlinks_count': 'Backlinks Externes',
+    'combined_performance_score': 'Combined PageSpeed Score (Sample)',
+}
+
+# Pairs listed in the Correlation tab, read from the matrices
+CORRELATION_PAIRS: List[Tuple[str, str]] = [
+    ('PageRank', 'clicks'),
+    ('PageRank', 'hits'),
+    ('Weighted_PageRank', 'clicks'),
+    ('Weighted_PageRank', 'hits'),
+    ('PageRank', 'Weighted_PageRank'),
+    ('PageRank', 'word_count'),
+    ('Weighted_PageRank', 'word_count'),
+    ('clicks', 'word_count'),
+    ('crawl_depth', 'PageRank'),
+    ('crawl_depth', 'Weighted_PageRank'),
+    ('crawl_depth', 'clicks'),
+    ('crawl_depth', 'word_count'),
+    ('PageRank', 'external_backlinks_count'),
+    ('Weighted_PageRank', 'external_backlinks_count'),
+    ('clicks', 'external_backlinks_count'),
+    ('hits', 'external_backlinks_count'),
+    ('PageRank', 'combined_performance_score'),
+    ('clicks', 'combined_performance_score'),
+    ('external_backlinks_count', 'combined_performance_score'),
+]
+
+def _metric_block(df: pd.DataFrame, metrics: List[str]) -> np.ndarray:
+    """
+    float32 (rows x metrics) block, missing values as NaN.
+    """
+    block = np.empty((len(df), len(metrics)), dtype=np.float32)
+    for k, metric in enumerate(metrics):
+        block[:, k] = pd.to_numeric(df[metric], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+    return block
+
+def _pairwise_pearson(block: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson matrix over pairwise-complete rows (as DataFrame.corr) from a handful
+    of matrix products over the block. Columns are standardized first so the
+    float32 sums stay well conditioned. Returns (matrix, pair counts).
+    """
+    valid = ~np.isnan(block)
+    present = valid.astype(np.float32)
+    x = block.copy()
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        # Columns without any value stay NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        x -= np.nanmean(x, axis=0)
+        scale = np.nanstd(x, axis=0)
+        x /= np.where(scale > 0, scale, 1)
+    x[~valid] = 0
+    counts = present.T @ present
+    # sums[i, j]: sum of column i over the rows where both i and j are present
+    sums = x.T @ present
+    squares = (x * x).T @ present
+    products = x.T @ x
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = products - sums * sums.T / counts
+        var = squares - sums ** 2 / counts
+        matrix = cov / np.sqrt(var * var.T)
+    matrix = np.clip(matrix.astype(np.float64), -1.0, 1.0)
+    matrix[counts < 2] = np.nan
+    np.fill_diagonal(matrix, np.where(np.diag(counts) >= 2, 1.0, np.nan))
+    return matrix, counts
+
+def _spearman(block: np.ndarray) -> np.ndarray:
+    """
+    Spearman matrix: Pearson over average ranks. Pairs whose columns are missing
+    on different rows are re-ranked on their common rows, as DataFrame.corr does.
+    """
+    valid = ~np.isnan(block)
+    ranks = rankdata(block, axis=0, nan_policy='omit').astype(np.float32)
+    matrix, _ = _pairwise_pearson(ranks)
+    for i, j in zip(*np.triu_indices(block.shape[1], k=1)):
+        both = valid[:, i] & valid[:, j]
+        if both.sum() < 2 or (np.array_equal(both, valid[:, i]) and np.array_equal(both, valid[:, j])):
+            continue
+        pair_ranks = rankdata(block[both][:, [i, j]], axis=0).astype(np.float32)
+        matrix[i, j] = matrix[j, i] = _pairwise_pearson(pair_ranks)[0][0, 1]
+    return matrix
+
+def correlation_matrices(df: pd.DataFrame, metrics: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Pearson and Spearman matrices of the metric columns, computed once on a float32 block.
+    """
+    metrics = [m for m in (metrics or CORRELATION_METRICS) if m in df.columns]
+    block = _metric_block(df, metrics)
+    pearson, counts = _pairwise_pearson(block)
+    return {
+        'pearson': pd.DataFrame(pearson, index=metrics, columns=metrics),
+        'spearman': pd.DataFrame(_spearman(block), index=metrics, columns=metrics),
+        'counts': pd.DataFrame(counts.astype(np.int64), index=metrics, columns=metrics),
+    }
+
+def correlation_tab(matrices: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Correlation tab: one row per listed metric pair, Pearson ('Value') and Spearman.
+    """
+    pearson, spearman = matrices['pearson'], matrices['spearman']
+    rows = [
+        {
+            'Correlation': f"{METRIC_LABELS.get(x, x)} vs {METRIC_LABELS.get(y, y)}",
+            'Value': pearson.at[x, y],
+            'Spearman': spearman.at[x, y],
+        }
+        for x, y in CORRELATION_PAIRS if x in pearson.index and y in pearson.index
+    ]
+    return pd.DataFrame(rows, columns=['Correlation', 'Value', 'Spearman']).dropna(subset=['Value'])
+
+def correlations_by_category(df: pd.DataFrame, metrics: Optional[List[str]] = None,
+                             min_rows: int = 30) -> pd.DataFrame:
+    """
+    Pearson and Spearman matrices per category (categories with at least min_rows
+    pages), in long format: category, metric_x, metric_y, pearson, spearman, pages.
+    """
+    metrics = [m for m in (metrics or CORRELATION_METRICS) if m in df.columns]
+    if 'category' not in df.columns or len(metrics) < 2:
+        return pd.DataFrame()
+    block = _metric_block(df, metrics)
+    codes, categories = pd.factorize(df['category'])
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(categories) + 1))
+    upper = np.triu_indices(len(metrics), k=1)
+    frames = []
+    for code, category in enumerate(categories):
+        rows = order[bounds[code]:bounds[code + 1]]
+        if len(rows) < min_rows:
+            continue
+        pearson, counts = _pairwise_pearson(block[rows])
+        spearman = _spearman(block[rows])
+        frames.append(pd.DataFrame({
+            'category': category,
+            'metric_x': np.array(metrics)[upper[0]],
+            'metric_y': np.array(metrics)[upper[1]],
+            'pearson': pearson[upper],
+            'spearman': spearman[upper],
+            'pages': counts[upper].astype(np.int64),
+        }))
+    logging.info(f"Correlation matrices computed for {len(frames)} categories (>= {min_rows} pages)")
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True).sort_values('category', kind='stable')
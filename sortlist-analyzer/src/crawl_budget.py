@@ -0,0 +1,97 @@
+import pandas as pd
+import logging
+from typing import Dict
+
+# Next.js image optimizer URLs: crawled by bots but never indexable content
+NEXT_IMAGE_PATTERN = '/_next/image'
+
+def analyze_crawl_budget(con) -> Dict[str, pd.DataFrame]:
+    """
+    Crawl-budget analytics over logs_events, computed in a single DuckDB
+    aggregation pass (GROUPING SETS) over the log table:
+    - hits per bot x category x day x status class,
+    - hits and last crawl per URL (kept in the crawl_budget_urls table),
+    - share of crawl wasted on 3xx/4xx responses and _next/image URLs.
+    Returns the Excel tabs CrawlBudget_Daily, CrawlBudget_Waste and CrawlBudget_LastCrawl.
+    """
+    try:
+        logging.info("Starting crawl budget analysis")
+        con.execute(f"""
+            CREATE OR REPLACE TEMP TABLE crawl_budget_agg AS
+            SELECT
+                GROUPING(url) = 0 as is_url_row,
+                url,
+                bot,
+                category,
+                day,
+                status_class,
+                COUNT(*) as hits,
+                COUNT(*) FILTER (WHERE contains(url, '{NEXT_IMAGE_PATTERN}')) as next_image_hits,
+                MAX(event_date) as last_crawl
+            FROM (
+                SELECT
+                    l.event_url as url,
+                    CAST(l.event_bot_name AS VARCHAR) as bot,
+                    COALESCE(c.category, 'Uncategorized') as category,
+                    CAST(l.event_date AS DATE) as day,
+                    COALESCE(CAST(l.event_status // 100 AS VARCHAR) || 'xx', 'unknown') as status_class,
+                    l.event_date
+                FROM logs_events l
+                LEFT JOIN (
+                    SELECT url, ANY_VALUE(category) as category
+                    FROM categorized
+                    GROUP BY url
+                ) c ON l.event_url = c.url
+            )
+            GROUP BY GROUPING SETS ((url), (bot, category, day, status_class));
+        """)
+        con.execute("""
+            CREATE OR REPLACE TABLE crawl_budget_urls AS
+            SELECT url, hits, next_image_hits, last_crawl
+            FROM crawl_budget_agg
+            WHERE is_url_row;
+        """)
+        daily = con.execute("""
+            SELECT bot, category, day, status_class, hits, next_image_hits
+            FROM crawl_budget_agg
+            WHERE NOT is_url_row
+            ORDER BY day, bot, category, status_class;
+        """).df()
+        # Summary per bot (plus an all-bots row) from the small daily aggregate
+        waste = con.execute("""
+            SELECT
+                CASE WHEN GROUPING(bot) = 1 THEN 'All bots' ELSE bot END as bot,
+                SUM(hits) as hits,
+                SUM(hits) FILTER (WHERE status_class = '3xx') as redirect_hits,
+                SUM(hits) FILTER (WHERE status_class = '4xx') as client_error_hits,
+                SUM(next_image_hits) as next_image_hits,
+                COALESCE(SUM(hits) FILTER (WHERE status_class IN ('3xx', '4xx')), 0)
+                    + COALESCE(SUM(next_image_hits) FILTER (WHERE status_class NOT IN ('3xx', '4xx')), 0) as wasted_hits,
+                wasted_hits / SUM(hits) as waste_share
+            FROM crawl_budget_agg
+            WHERE NOT is_url_row
+            GROUP BY GROUPING SETS ((bot), ())
+            ORDER BY GROUPING(bot) DESC, hits DESC;
+        """).df()
+        # Days since last crawl, relative to the end of the log export; pages never crawled stay empty
+        last_crawl = con.execute("""
+            SELECT
+                p.url,
+                COALESCE(u.hits, 0) as hits,
+                u.last_crawl,
+                date_diff('day', u.last_crawl, (SELECT MAX(event_date) FROM logs_events)) as days_since_last_crawl
+            FROM (SELECT DISTINCT url FROM pages) p
+            LEFT JOIN crawl_budget_urls u ON p.url = u.url
+            ORDER BY days_since_last_crawl DESC NULLS FIRST;
+        """).df()
+        if not waste.empty:
+            logging.info(f"Crawl budget: {len(daily)} bot/category/day/status rows, "
+                         f"{waste['waste_share'].iloc[0]:.1%} of bot hits wasted on 3xx/4xx/_next/image")
+        return {
+            'CrawlBudget_Daily': daily,
+            'CrawlBudget_Waste': waste,
+            'CrawlBudget_LastCrawl': last_crawl
+        }
+    except Exception as e:
+        logging.error(f"Error during crawl budget analysis: {str(e)}")
+        return {}
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+MANIFEST_FILE = 'manifest.json'
+
+def file_sha256(path: str, chunk_size: int = 8 * 1024 * 1024) -> str:
+    """
+    Streams a file through SHA-256 without loading it in memory.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _load_manifest(cache_dir: str) -> Dict[str, Any]:
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Cache manifest {manifest_path} unreadable, cache rebuilt: {e}")
+        return {}
+
+def _save_manifest(cache_dir: str, manifest: Dict[str, Any]) -> None:
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def _cached_parquet(entry: Optional[Dict[str, Any]], source_path: str, query_hash: str,
+                    stat: os.stat_result) -> Optional[str]:
+    """
+    Returns the Parquet file of a manifest entry that is still valid for the source,
+    checking path, size, mtime and query first and falling back to the content hash
+    when only the mtime changed (file touched or copied).
+    """
+    if not entry or entry.get('source_path') != source_path or entry.get('query_hash') != query_hash:
+        return None
+    if entry.get('size') != stat.st_size or not os.path.exists(entry.get('parquet', '')):
+        return None
+    if entry.get('mtime_ns') == stat.st_mtime_ns:
+        return entry['parquet']
+    if entry.get('sha256') == file_sha256(source_path):
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return entry['parquet']
+    return None
+
+def load_cached_table(con, table_name: str, select_sql: str, source_path: str, source_sql: str,
+                      cache_dir: str) -> bool:
+    """
+    Creates table_name from select_sql (a SELECT template with a {source} placeholder).
+    The parsed result is cached as Parquet in cache_dir, keyed by source path, size,
+    mtime, SHA-256 and the query (with its read options); re-runs read the Parquet file instead of
+    re-parsing the source. Returns True on a cache hit.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = _load_manifest(cache_dir)
+    source_path = os.path.abspath(source_path)
+    stat = os.stat(source_path)
+    # The read options are part of the key: a schema change re-ingests the source
+    query_hash = hashlib.sha256(select_sql.format(source=source_sql).encode('utf-8')).hexdigest()
+    entry = manifest.get(table_name)
+    parquet_path = _cached_parquet(entry, source_path, query_hash, stat)
+    hit = parquet_path is not None
+    if not hit:
+        parquet_path = os.path.abspath(os.path.join(cache_dir, f'{table_name}.parquet'))
+        con.execute(f"COPY ({select_sql.format(source=source_sql)}) TO '{parquet_path}' (FORMAT PARQUET)")
+        entry = {
+            'source_path': source_path,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_sha256(source_path),
+            'query_hash': query_hash,
+            'parquet': parquet_path
+        }
+    manifest[table_name] = entry
+    _save_manifest(cache_dir, manifest)
+    con.execute(f"CREATE TABLE {table_name} AS SELECT * FROM read_parquet('{parquet_path}')")
+    logging.info(f"{table_name}: {'cache hit' if hit else 'parsed and cached'} ({parquet_path})")
+    return hit
@@ -3,86 +3,132 @@ import duckdb
 import logging
 import os
 import yaml
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from data_cache import load_cached_table
+from schemas import apply_enums, select_sql, source_read_sql
+from profiling import profile
+from url_categories import categorize_table, compile_rules
 
 def load_config(config_path: str) -> Dict[str, Any]:
     with open(config_path, 'r') as f:
         return yaml.safe_load(f)
 
+def create_table_from_csv(con, table_name: str, source: str, csv_path: str,
+                          cache_dir: Optional[str] = None) -> None:
+    """
+    Creates table_name from a CSV using the declared schema of source (schemas.py).
+    With a cache_dir, the parsed table is served from the Parquet cache when the
+    CSV did not change since the previous run. A .parquet path (e.g. the Search
+    Console daily rollup) is read directly, without the cache.
+    """
+    source_sql = source_read_sql(source, csv_path)
+    query = select_sql(source)
+    if cache_dir and not csv_path.endswith('.parquet'):
+        load_cached_table(con, table_name, query, csv_path, source_sql, cache_dir)
+    else:
+        con.execute(f"CREATE TABLE {table_name} AS {query.format(source=source_sql)}")
+
+def load_source(con, table_name: str, source: str, csv_path: str, cache_dir: Optional[str] = None) -> None:
+    """
+    Loads a source table and stores its low-cardinality columns as ENUM.
+    """
+    create_table_from_csv(con, table_name, source, csv_path, cache_dir)
+    apply_enums(con, table_name, source)
+
+def load_encoded_edges(con, edges_path: str, cache_dir: Optional[str] = None) -> None:
+    """
+    Loads links as integer id pairs against a urls(id, url, is_internal) dimension.
+    The dimension covers page and link URLs; is_internal on edges is true when
+    both ends are sortlist.com URLs, so later scans never touch the URL strings.
+    """
+    create_table_from_csv(con, 'edges_raw', 'edges', edges_path, cache_dir)
+    con.execute('''
+        CREATE TABLE urls AS
+        SELECT
+            CAST(ROW_NUMBER() OVER () - 1 AS INTEGER) as id,
+            url,
+            url LIKE 'https://www.sortlist.com/%' as is_internal
+        FROM (
+            SELECT url FROM pages
+            UNION SELECT src FROM edges_raw
+            UNION SELECT dst FROM edges_raw
+        )
+        WHERE url IS NOT NULL;
+    ''')
+    con.execute('''
+        CREATE TABLE edges AS
+        SELECT 
+            s.id as src_id,
+            d.id as dst_id,
+            e.link_type,
+            e.pos,
+            s.is_internal AND d.is_internal as is_internal
+        FROM edges_raw e
+        JOIN urls s ON e.src = s.url
+        JOIN urls d ON e.dst = d.url;
+    ''')
+    con.execute('DROP TABLE edges_raw')
+    apply_enums(con, 'edges', 'edges')
+    logging.info(f"URL dictionary built: {con.execute('SELECT COUNT(*) FROM urls').fetchone()[0]} URLs")
+
+def edges_are_encoded(con) -> bool:
+    """
+    True when the edges table was loaded as integer id pairs (edge_encoding: dictionary).
+    """
+    return con.execute("""
+        SELECT COUNT(*)
+        FROM information_schema.columns
+        WHERE table_name = 'edges' AND column_name = 'src_id';
+    """).fetchone()[0] > 0
+
+def _table_rows(con, table_name: str) -> int:
+    return con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+
 def load_data(con, config: Dict[str, Any]) -> bool:
     data_dir = config['data_dir']
     files = config['csv_files']
+    cache_dir = config.get('cache_dir')
     try:
         # Load pages
         pages_path = os.path.join(data_dir, files['pages'])
-        con.execute(f'''
-            CREATE TABLE pages AS
-            SELECT 
-                "Adresse" as url,
-                "Type de contenu" as content_type,
-                "Code HTTP" as http_code,
-                "Statut" as status,
-                "Indexabilité" as indexability,
-                "Liens entrants" as incoming_links,
-                "Liens sortants" as outgoing_links,
-                "Crawl profondeur" as crawl_depth,
-                "Nombre de mots" as word_count
-            FROM read_csv_auto('{pages_path}');
-        ''')
+        with profile('load', 'pages') as record:
+            load_source(con, 'pages', 'pages', pages_path, cache_dir)
+            record['rows'] = _table_rows(con, 'pages')
         logging.info(f"Pages loaded from {pages_path}")
 
         # Load links
         edges_path = os.path.join(data_dir, files['edges'])
-        con.execute(f'''
-            CREATE TABLE edges AS
-            SELECT 
-                "Source" as src,
-                "Destination" as dst,
-                "Type" as link_type,
-                "Position du lien" as pos
-            FROM read_csv_auto('{edges_path}');
-        ''')
+        with profile('load', 'edges') as record:
+            if config.get('edge_encoding', 'url') == 'dictionary':
+                load_encoded_edges(con, edges_path, cache_dir)
+            else:
+                load_source(con, 'edges', 'edges', edges_path, cache_dir)
+            record['rows'] = _table_rows(con, 'edges')
         logging.info(f"Links loaded from {edges_path}")
 
-        # Load categories
-        cat_path = os.path.join(data_dir, files['categories'])
-        con.execute(f'''
-            CREATE TABLE categorized AS
-            SELECT 
-                Adresse as url,
-                Category as category,
-                Label as label,
-                Country as country,
-                Location as location
-            FROM read_csv_auto('{cat_path}');
-        ''')
-        logging.info(f"Categories loaded from {cat_path}")
+        # Load categories, or derive them from the page URLs
+        with profile('load', 'categorized') as record:
+            if config.get('categories_source', 'file') == 'pages':
+                categorize_table(con, 'SELECT url FROM pages', 'categorized', compile_rules(config.get('url_categories')))
+                logging.info("Categories computed from the page URLs")
+            else:
+                cat_path = os.path.join(data_dir, files['categories'])
+                load_source(con, 'categorized', 'categories', cat_path, cache_dir)
+                logging.info(f"Categories loaded from {cat_path}")
+            record['rows'] = _table_rows(con, 'categorized')
 
         # Load traffic
         traffic_path = os.path.join(data_dir, files['traffic'])
-        con.execute(f'''
-            CREATE TABLE traffic AS
-            SELECT 
-                URL as url,
-                Clicks as clicks,
-                Impressions as impressions,
-                CTR as ctr,
-                "Average Position" as avg_position
-            FROM read_csv_auto('{traffic_path}');
-        ''')
+        with profile('load', 'traffic') as record:
+            load_source(con, 'traffic', 'traffic', traffic_path, cache_dir)
+            record['rows'] = _table_rows(con, 'traffic')
         logging.info(f"Traffic loaded from {traffic_path}")
 
         # Load engine logs
         logs_path = os.path.join(data_dir, files['logs'])
-        con.execute(f'''
-            CREATE TABLE logs_events AS
-            SELECT 
-                event_url,
-                event_bot_name,
-                event_datetime as event_date,
-                event_status_code as event_status
-            FROM read_csv_auto('{logs_path}');
-        ''')
+        with profile('load', 'logs_events') as record:
+            load_source(con, 'logs_events', 'logs', logs_path, cache_dir)
+            record['rows'] = _table_rows(con, 'logs_events')
         logging.info(f"Engine logs loaded from {logs_path}")
 
         return True
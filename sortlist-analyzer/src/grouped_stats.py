@@ -0,0 +1,102 @@
+import logging
+import pandas as pd
+from typing import Any, Dict, List, Optional
+
+# Group dimensions: column -> Excel sheet and optional label for missing/empty
+# values (rows with a missing key are dropped otherwise, like groupby()).
+DEFAULT_DIMENSIONS: Dict[str, Dict[str, Any]] = {
+    'category': {'sheet': 'CategoryStats'},
+    'label': {'sheet': 'LabelStats'},
+    'location': {'sheet': 'LocationStats', 'fill_null': 'Unknown'},
+}
+
+# Aggregates per metric column: a list of functions (output <column>_<func>)
+# or a {func: output column} mapping. Metrics missing from the frame are skipped.
+DEFAULT_AGGREGATES: Dict[str, Any] = {
+    'PageRank': ['mean', 'min', 'max', 'median'],
+    'clicks': ['mean', 'min', 'max', 'median'],
+    'hits': ['mean', 'min', 'max', 'median'],
+    'word_count': ['mean', 'min', 'max', 'median'],
+    'crawl_depth': ['mean', 'min', 'max', 'median'],
+    'external_backlinks_count': ['sum', 'mean', 'median'],
+    'combined_performance_score': {'mean': 'avg_combined_pagespeed_score_sample'},
+}
+
+# pandas aggregation names -> DuckDB aggregate functions
+SQL_AGGREGATES = {
+    'mean': 'avg',
+    'min': 'min',
+    'max': 'max',
+    'median': 'median',
+    'sum': 'sum',
+    'count': 'count',
+    'std': 'stddev_samp',
+}
+
+def _aggregate_columns(df: pd.DataFrame, aggregates: Dict[str, Any]) -> List[tuple]:
+    """
+    (metric column, function, output column) for every aggregate whose metric is in the frame.
+    """
+    columns = []
+    for metric, funcs in aggregates.items():
+        if metric not in df.columns:
+            continue
+        outputs = funcs if isinstance(funcs, dict) else {func: f'{metric}_{func}' for func in funcs}
+        for func, output in outputs.items():
+            if func not in SQL_AGGREGATES:
+                raise ValueError(f"Unsupported aggregate '{func}' for {metric}")
+            columns.append((metric, func, output))
+    return columns
+
+def _sheet_name(dim: str, spec: Dict[str, Any]) -> str:
+    return spec.get('sheet') or ''.join(part.title() for part in dim.split('_')) + 'Stats'
+
+def compute_grouped_stats(con, df: pd.DataFrame,
+                          stats_config: Optional[Dict[str, Any]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Per-dimension statistics (CategoryStats, LabelStats, LocationStats, ...) in a
+    single DuckDB GROUPING SETS pass over df, scanned in place without copying it.
+    Returns one DataFrame per sheet, sorted by the dimension value; dimensions that
+    are missing or entirely empty give an empty frame with only the dimension column.
+    """
+    stats_config = stats_config or {}
+    dimensions = stats_config.get('dimensions') or DEFAULT_DIMENSIONS
+    aggregates = stats_config.get('aggregates') or DEFAULT_AGGREGATES
+    columns = _aggregate_columns(df, aggregates)
+    results = {_sheet_name(dim, spec): pd.DataFrame({dim: []}) for dim, spec in dimensions.items()}
+    active = [dim for dim in dimensions if dim in df.columns and df[dim].notna().any()]
+    for dim in dimensions:
+        if dim not in active:
+            logging.warning(f"Column '{dim}' not found or entirely empty, no {dim} statistics generated.")
+    if not active or not columns:
+        return results
+
+    keys = []
+    for dim in active:
+        fill_null = dimensions[dim].get('fill_null')
+        if fill_null is not None:
+            keys.append(f"COALESCE(NULLIF(CAST(\"{dim}\" AS VARCHAR), ''), '{fill_null}') as \"{dim}\"")
+        else:
+            keys.append(f'"{dim}"')
+    select_aggregates = ',\n'.join(f'{SQL_AGGREGATES[func]}("{metric}") as "{output}"' for metric, func, output in columns)
+    grouping_flags = ',\n'.join(f'GROUPING("{dim}") = 0 as "_in_{dim}"' for dim in active)
+    con.register('grouped_stats_input', df)
+    try:
+        grouped = con.execute(f"""
+            SELECT
+                {', '.join(f'"{dim}"' for dim in active)},
+                {grouping_flags},
+                {select_aggregates}
+            FROM (SELECT {', '.join(keys)}, {', '.join(sorted({f'"{metric}"' for metric, _, _ in columns}))} FROM grouped_stats_input)
+            GROUP BY GROUPING SETS ({', '.join(f'("{dim}")' for dim in active)})
+        """).df()
+    finally:
+        con.unregister('grouped_stats_input')
+
+    outputs = [output for _, _, output in columns]
+    for dim in active:
+        rows = grouped[grouped[f'_in_{dim}'] & grouped[dim].notna()]
+        sheet = _sheet_name(dim, dimensions[dim])
+        results[sheet] = rows[[dim] + outputs].sort_values(dim).reset_index(drop=True)
+        logging.info(f"{sheet}: {len(results[sheet])} {dim} groups")
+    return results
@@ -1,11 +1,17 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+import argparse
 
-def analyze_log_file(log_file_path, output_reports_dir):
+# Rows per chunk when streaming the log file
+DEFAULT_CHUNKSIZE = 500_000
+
+def analyze_log_file(log_file_path, output_reports_dir, chunksize=DEFAULT_CHUNKSIZE):
     """
     Analyzes a log CSV file to generate a pie chart of status codes
     and an Excel file detailing 403 and 410 errors for Sortlist URLs.
+    The file is read in a single streaming pass of chunksize rows, so
+    multi-day logs larger than memory can be analyzed.
     """
     try:
         # Create output directories if they don't exist
@@ -14,32 +20,37 @@ def analyze_log_file(log_file_path, output_reports_dir):
         os.makedirs(charts_output_dir, exist_ok=True)
         print(f"Ensured output directories exist: {output_reports_dir} and {charts_output_dir}")
 
-        # Load the data
-        print(f"Loading log file: {log_file_path}")
-        df = pd.read_csv(log_file_path)
-        print(f"Successfully loaded {len(df)} rows from {log_file_path}.")
-
-        # Ensure 'event_url' is string type for filtering
-        df['event_url'] = df['event_url'].astype(str)
-        # Convert status codes to numeric, coercing errors to NaN (which can then be handled or dropped if necessary)
-        df['event_status_code'] = pd.to_numeric(df['event_status_code'], errors='coerce')
-
-
-        # Filter for Sortlist URLs
-        df_sortlist = df[df['event_url'].str.contains('https://www.sortlist.com/', na=False)].copy()
-        print(f"Found {len(df_sortlist)} rows for Sortlist URLs.")
-
-        if df_sortlist.empty:
+        # Stream the log in chunks: only the running status counts and the
+        # 403/410 rows are kept, so memory stays bounded by chunksize
+        print(f"Streaming log file: {log_file_path} ({chunksize} rows per chunk)")
+        total_rows = 0
+        sortlist_rows = 0
+        status_counts = pd.Series(dtype='int64')
+        error_chunks = {403: [], 410: []}
+        for chunk in pd.read_csv(log_file_path, chunksize=chunksize):
+            total_rows += len(chunk)
+            # Ensure 'event_url' is string type for filtering
+            chunk['event_url'] = chunk['event_url'].astype(str)
+            # Filter for Sortlist URLs
+            chunk = chunk[chunk['event_url'].str.contains('https://www.sortlist.com/', na=False, regex=False)]
+            sortlist_rows += len(chunk)
+            # Convert status codes to numeric, dropping rows that cannot be converted
+            chunk = chunk.assign(event_status_code=pd.to_numeric(chunk['event_status_code'], errors='coerce'))
+            chunk = chunk.dropna(subset=['event_status_code'])
+            codes = chunk['event_status_code'].astype(int)
+            status_counts = status_counts.add(codes.value_counts(), fill_value=0)
+            for code, chunks in error_chunks.items():
+                chunks.append(chunk[codes == code])
+        print(f"Successfully streamed {total_rows} rows from {log_file_path}.")
+        print(f"Found {sortlist_rows} rows for Sortlist URLs.")
+
+        if sortlist_rows == 0:
             print("No data found for https://www.sortlist.com/ URLs. Exiting.")
             return
 
         # --- 1. Generate Pie Chart for event_status_code distribution ---
-        # Drop rows where status code could not be converted to numeric for reliable analysis
-        df_sortlist_valid_codes = df_sortlist.dropna(subset=['event_status_code']).copy()
-        # Convert numeric status codes to integer for cleaner representation
-        df_sortlist_valid_codes.loc[:, 'event_status_code_int'] = df_sortlist_valid_codes['event_status_code'].astype(int)
-        
-        status_counts = df_sortlist_valid_codes['event_status_code_int'].value_counts()
+        status_counts = status_counts.astype(int).sort_values(ascending=False)
+        status_counts.index = status_counts.index.astype(int)
         
         print("\nStatus Code Counts for Sortlist URLs:")
         print(status_counts)
@@ -71,9 +82,8 @@ def analyze_log_file(log_file_path, output_reports_dir):
             print("No valid status codes to plot for Sortlist URLs.")
 
         # --- 2. Generate Excel file with 403 and 410 error details ---
-        # Use the df_sortlist_valid_codes for error filtering as it has integer status codes
-        df_403 = df_sortlist_valid_codes[df_sortlist_valid_codes['event_status_code_int'] == 403]
-        df_410 = df_sortlist_valid_codes[df_sortlist_valid_codes['event_status_code_int'] == 410]
+        df_403 = pd.concat(error_chunks[403], ignore_index=True)
+        df_410 = pd.concat(error_chunks[410], ignore_index=True)
         
         print(f"\nFound {len(df_403)} rows with status 403 for Sortlist URLs.")
         print(f"Found {len(df_410)} rows with status 410 for Sortlist URLs.")
@@ -81,13 +91,13 @@ def analyze_log_file(log_file_path, output_reports_dir):
         excel_file_path = os.path.join(output_reports_dir, 'sortlist_http_error_details.xlsx')
         with pd.ExcelWriter(excel_file_path, engine='xlsxwriter') as writer:
             if not df_403.empty:
-                df_403.drop(columns=['event_status_code_int']).to_excel(writer, sheet_name='403_Errors', index=False)
+                df_403.to_excel(writer, sheet_name='403_Errors', index=False)
                 print("403 errors sheet created.")
             else:
                 print("No 403 errors found for Sortlist URLs to write to Excel.")
             
             if not df_410.empty:
-                df_410.drop(columns=['event_status_code_int']).to_excel(writer, sheet_name='410_Errors', index=False)
+                df_410.to_excel(writer, sheet_name='410_Errors', index=False)
                 print("410 errors sheet created.")
             else:
                 print("No 410 errors found for Sortlist URLs to write to Excel.")
@@ -124,14 +134,18 @@ if __name__ == '__main__':
     DEFAULT_LOG_FILE = os.path.join(PROJECT_ANALYZER_DIR, 'data', 'COM_ALL_2025-05-05_581c699d451c950526bcfa28_logs_events.csv')
     DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_ANALYZER_DIR, 'reports')
 
-    # You can change these paths if needed
-    input_log_file_path = DEFAULT_LOG_FILE
-    output_reports_directory = DEFAULT_OUTPUT_DIR
+    parser = argparse.ArgumentParser(description="Streams a logs_events CSV and reports status codes and 403/410 errors")
+    parser.add_argument('--log-file', default=DEFAULT_LOG_FILE, help='Path to the logs_events CSV')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help='Reports directory')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='Rows read per chunk')
+    args = parser.parse_args()
+    input_log_file_path = args.log_file
+    output_reports_directory = args.output_dir
     
     print(f"Script directory: {SCRIPT_DIR}")
     print(f"Project analyzer directory: {PROJECT_ANALYZER_DIR}")
     print(f"Input log file: {input_log_file_path}")
     print(f"Output reports directory: {output_reports_directory}")
 
-    analyze_log_file(input_log_file_path, output_reports_directory)
+    analyze_log_file(input_log_file_path, output_reports_directory, args.chunksize)
     print("\nLog analysis script finished.") 
\ No newline at end of file
@@ -1,16 +1,97 @@
 import pandas as pd
-import networkx as nx
 import logging
-from typing import Tuple
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.cluster import KMeans
 import numpy as np
+from data_loading import edges_are_encoded
+from pagerank_engine import build_link_graph, pagerank
 
-def calculate_pagerank(con) -> Tuple[pd.DataFrame, pd.DataFrame]:
+# Position weighting used when config.yaml does not declare any profile
+DEFAULT_WEIGHTING_PROFILES = [
+    {
+        'name': 'Weighted_PageRank',
+        'default_weight': 0.2,
+        'weights': {
+            "Contenu": 1.0,
+            "Header": 0.5,
+            "Footer": 0.3,
+            "Sidebar": 0.4,
+            "Menu": 0.6
+        }
+    }
+]
+
+def _load_pagerank_state(con, state_dir: str) -> Optional[Dict[str, Any]]:
+    """
+    Loads the rank vectors, URL mapping and link table persisted by the previous run.
+    """
+    meta_path = os.path.join(state_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        ranks = con.execute(f"SELECT * FROM read_parquet('{os.path.join(state_dir, 'ranks.parquet')}')").df()
+        return {'meta': meta, 'ranks': ranks, 'edges_path': os.path.join(state_dir, 'edges.parquet')}
+    except Exception as e:
+        logging.warning(f"Previous PageRank state in {state_dir} could not be read, cold start: {e}")
+        return None
+
+def _save_pagerank_state(con, state_dir: str, meta: Dict[str, Any], ranks_df: pd.DataFrame) -> None:
+    """
+    Persists the rank vectors, URL mapping and link table used to warm-start the next run.
+    """
+    try:
+        os.makedirs(state_dir, exist_ok=True)
+        con.register('pagerank_state_ranks', ranks_df)
+        con.execute(f"COPY pagerank_state_ranks TO '{os.path.join(state_dir, 'ranks.parquet')}' (FORMAT PARQUET)")
+        con.unregister('pagerank_state_ranks')
+        con.execute(f"COPY pagerank_edges TO '{os.path.join(state_dir, 'edges.parquet')}' (FORMAT PARQUET)")
+        with open(os.path.join(state_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        logging.info(f"PageRank state saved to {state_dir}")
+    except Exception as e:
+        logging.warning(f"PageRank state could not be saved to {state_dir}: {e}")
+
+def _edge_delta(con, edges_path: str) -> Tuple[int, int]:
+    """
+    Counts links added and removed since the previous run (src, dst, pos, link_count).
+    """
+    added, removed = con.execute(f"""
+        SELECT
+            (SELECT COUNT(*) FROM (
+                SELECT src, dst, pos, link_count FROM pagerank_edges
+                EXCEPT
+                SELECT src, dst, pos, link_count FROM read_parquet('{edges_path}'))),
+            (SELECT COUNT(*) FROM (
+                SELECT src, dst, pos, link_count FROM read_parquet('{edges_path}')
+                EXCEPT
+                SELECT src, dst, pos, link_count FROM pagerank_edges));
+    """).fetchone()
+    return added, removed
+
+def calculate_pagerank(con, pagerank_config: Optional[Dict[str, Any]] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Calculates standard and weighted PageRank from DuckDB tables.
-    Returns two DataFrames: pr_df (standard PageRank), prw_df (weighted PageRank).
+    Every weighting profile of pagerank_config['weighting_profiles'] is solved in
+    the same batched power iteration as the standard PageRank.
+    When pagerank_config['state_dir'] is set, the previous run's ranks warm-start
+    the iteration and are reused as-is when neither the links nor the settings changed.
+    Returns two DataFrames: pr_df (standard PageRank), prw_df (one column per
+    weighting profile, including Weighted_PageRank).
     """
+    pagerank_config = pagerank_config or {}
+    alpha = pagerank_config.get('alpha', 0.85)
+    max_iter = pagerank_config.get('max_iter', 100)
+    tol = pagerank_config.get('tol', 1e-6)
+    profiles = pagerank_config.get('weighting_profiles') or DEFAULT_WEIGHTING_PROFILES
+    if not any(profile['name'] == 'Weighted_PageRank' for profile in profiles):
+        profiles = DEFAULT_WEIGHTING_PROFILES + list(profiles)
+    state_dir = pagerank_config.get('state_dir')
+    settings = {'alpha': alpha, 'max_iter': max_iter, 'tol': tol, 'weighting_profiles': profiles}
     try:
         logging.info("Starting PageRank calculation")
         # Retrieve internal URLs
@@ -23,63 +104,96 @@ def calculate_pagerank(con) -> Tuple[pd.DataFrame, pd.DataFrame]:
             raise ValueError("No internal URLs found")
         logging.info(f"{len(internal_urls)} internal URLs identified")
         # Retrieve incoming links
-        edges_df = con.execute("""
-            SELECT 
-                src as src,
-                dst as dst,
-                pos as pos,
-                COUNT(*) as link_count
-            FROM edges
-            WHERE src LIKE 'https://www.sortlist.com/%'
-              AND dst LIKE 'https://www.sortlist.com/%'
-              AND src != dst
-            GROUP BY src, dst, pos;
-        """).df()
+        if edges_are_encoded(con):
+            # Filter and group on integer ids, decode only the distinct internal links
+            con.execute("""
+                CREATE OR REPLACE TEMP TABLE pagerank_edges AS
+                SELECT 
+                    su.url as src,
+                    du.url as dst,
+                    CAST(e.pos AS VARCHAR) as pos,
+                    e.link_count as link_count
+                FROM (
+                    SELECT src_id, dst_id, pos, COUNT(*) as link_count
+                    FROM edges
+                    WHERE is_internal
+                      AND src_id != dst_id
+                    GROUP BY src_id, dst_id, pos
+                ) e
+                JOIN urls su ON e.src_id = su.id
+                JOIN urls du ON e.dst_id = du.id;
+            """)
+        else:
+            con.execute("""
+                CREATE OR REPLACE TEMP TABLE pagerank_edges AS
+                SELECT 
+                    src as src,
+                    dst as dst,
+                    CAST(pos AS VARCHAR) as pos,
+                    COUNT(*) as link_count
+                FROM edges
+                WHERE src LIKE 'https://www.sortlist.com/%'
+                  AND dst LIKE 'https://www.sortlist.com/%'
+                  AND src != dst
+                GROUP BY src, dst, CAST(pos AS VARCHAR);
+            """)
+        edges_df = con.table('pagerank_edges').df()
         if len(edges_df) == 0:
             raise ValueError("No internal links found")
         logging.info(f"{len(edges_df)} unique internal links identified")
-        # Standard PageRank
-        G = nx.DiGraph()
-        all_urls = set(internal_urls['url'].unique())
-        for url in all_urls:
-            G.add_node(url)
-        for _, row in edges_df.iterrows():
-            G.add_edge(row['src'], row['dst'], weight=row['link_count'])
-        pr_dict = nx.pagerank(
-            G,
-            alpha=0.85,
-            max_iter=100,
-            tol=1e-6,
-            nstart=None,
-            weight='weight'
-        )
-        pr_df = pd.DataFrame(list(pr_dict.items()), columns=['url', 'PageRank'])
-        logging.info(f"Standard PageRank calculated for {len(pr_df)} URLs")
-        # Weighted PageRank (by link position)
-        weight_map = {
-            "Contenu": 1.0,
-            "Header": 0.5,
-            "Footer": 0.3,
-            "Sidebar": 0.4,
-            "Menu": 0.6
-        }
-        Gw = nx.DiGraph()
-        for url in all_urls:
-            Gw.add_node(url)
-        for _, row in edges_df.iterrows():
-            pos_weight = weight_map.get(row['pos'], 0.2)
-            total_weight = pos_weight * row['link_count']
-            Gw.add_edge(row['src'], row['dst'], weight=total_weight)
-        prw_dict = nx.pagerank(
-            Gw,
-            alpha=0.85,
-            max_iter=100,
-            tol=1e-6,
-            nstart=None,
-            weight='weight'
-        )
-        prw_df = pd.DataFrame(list(prw_dict.items()), columns=['url', 'Weighted_PageRank'])
-        logging.info(f"Weighted PageRank calculated for {len(prw_df)} URLs")
+        # One interned CSR structure shared by every weighting
+        graph = build_link_graph(internal_urls['url'].values, edges_df['src'].values, edges_df['dst'].values)
+        logging.info(f"Link graph built: {graph.n_nodes} nodes, {graph.n_slots} distinct links")
+        link_count = edges_df['link_count'].to_numpy(dtype=float)
+        # Column 0 is the standard PageRank, the others are the position-weighted profiles
+        link_weights = [link_count]
+        for profile in profiles:
+            pos_weight = edges_df['pos'].map(profile.get('weights', {})).fillna(profile.get('default_weight', 0.2))
+            link_weights.append(pos_weight.to_numpy(dtype=float) * link_count)
+        rank_columns = ['PageRank'] + [profile['name'] for profile in profiles]
+        previous = _load_pagerank_state(con, state_dir) if state_dir else None
+        nstart = None
+        ranks = None
+        if previous is not None:
+            added, removed = _edge_delta(con, previous['edges_path'])
+            previous_ranks = previous['ranks'].set_index('url')
+            new_urls = int((~graph.urls.isin(previous_ranks.index)).sum())
+            dropped_urls = int((~previous_ranks.index.isin(graph.urls)).sum())
+            logging.info(f"PageRank delta vs previous run: +{added} / -{removed} links, "
+                         f"+{new_urls} / -{dropped_urls} URLs")
+            previous_ranks = previous_ranks.reindex(graph.urls)
+            if (added + removed + new_urls + dropped_urls == 0
+                    and previous['meta'].get('settings') == settings
+                    and all(col in previous_ranks.columns for col in rank_columns)):
+                ranks = previous_ranks[rank_columns].to_numpy()
+                iterations = 0
+                logging.info("Links and settings unchanged, previous PageRank reused without solving")
+            else:
+                nstart = np.column_stack([
+                    previous_ranks[col].fillna(1.0 / graph.n_nodes).to_numpy()
+                    if col in previous_ranks.columns else np.full(graph.n_nodes, 1.0 / graph.n_nodes)
+                    for col in rank_columns
+                ])
+        if ranks is None:
+            ranks, iterations = pagerank(
+                graph,
+                graph.slot_weights(np.column_stack(link_weights)),
+                alpha=alpha,
+                max_iter=max_iter,
+                tol=tol,
+                nstart=nstart
+            )
+            if state_dir:
+                ranks_df = pd.DataFrame(ranks, columns=rank_columns)
+                ranks_df.insert(0, 'url', graph.urls)
+                _save_pagerank_state(con, state_dir, {'settings': settings, 'iterations': iterations}, ranks_df)
+        pr_df = pd.DataFrame({'url': graph.urls, 'PageRank': ranks[:, 0]})
+        prw_df = pd.DataFrame({'url': graph.urls})
+        for k, profile in enumerate(profiles, start=1):
+            prw_df[profile['name']] = ranks[:, k]
+        logging.info(f"PageRank calculated for {len(pr_df)} URLs and {len(profiles)} weighting profiles "
+                     f"({', '.join(profile['name'] for profile in profiles)}) in {iterations} iterations"
+                     f"{' (warm start)' if nstart is not None else ''}")
         return pr_df, prw_df
     except Exception as e:
         logging.error(f"Error during PageRank calculation: {str(e)}")
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from typing import Optional, Tuple
+
+
+class PageRankConvergenceError(RuntimeError):
+    """Raised when power iteration does not converge within max_iter."""
+
+
+class LinkGraph:
+    """
+    Internal link graph with URLs interned to integer ids.
+    Parallel links between the same (src, dst) pair are collapsed into a single
+    slot; slots are kept in CSR order (sorted by source, then destination) so
+    that several weightings can reuse the same adjacency structure.
+    """
+
+    def __init__(self, urls: pd.Index, rows: np.ndarray, cols: np.ndarray, slot_of_link: np.ndarray):
+        self.urls = urls
+        self.n_nodes = len(urls)
+        self.rows = rows
+        self.cols = cols
+        self.slot_of_link = slot_of_link
+        self.n_slots = len(rows)
+
+    def slot_weights(self, link_weights: np.ndarray) -> np.ndarray:
+        """
+        Sums per-link weights into their (src, dst) slots.
+        Accepts an (n_links,) vector or an (n_links, K) matrix, one column per weighting.
+        """
+        link_weights = np.asarray(link_weights, dtype=float)
+        if link_weights.ndim == 1:
+            link_weights = link_weights[:, None]
+        return np.column_stack([
+            np.bincount(self.slot_of_link, weights=link_weights[:, k], minlength=self.n_slots)
+            for k in range(link_weights.shape[1])
+        ])
+
+
+def build_link_graph(node_urls, src_urls, dst_urls) -> LinkGraph:
+    """
+    Interns node and link URLs to integer ids and builds the shared CSR structure.
+    Link endpoints missing from node_urls are added as nodes, like nx.DiGraph.add_edge.
+    """
+    src_urls = np.asarray(src_urls, dtype=object)
+    dst_urls = np.asarray(dst_urls, dtype=object)
+    all_urls = np.concatenate([np.asarray(node_urls, dtype=object), src_urls, dst_urls])
+    codes, urls = pd.factorize(all_urls)
+    n_nodes = len(urls)
+    n_links = len(src_urls)
+    offset = len(all_urls) - 2 * n_links
+    src_ids = codes[offset:offset + n_links].astype(np.int64)
+    dst_ids = codes[offset + n_links:].astype(np.int64)
+    # Sorted unique (src, dst) keys are already in CSR order
+    keys, slot_of_link = np.unique(src_ids * n_nodes + dst_ids, return_inverse=True)
+    rows = (keys // n_nodes).astype(np.int64)
+    cols = (keys % n_nodes).astype(np.int32)
+    return LinkGraph(pd.Index(urls), rows, cols, slot_of_link.ravel())
+
+
+def pagerank(graph: LinkGraph, slot_weights: np.ndarray, alpha: float = 0.85, max_iter: int = 100,
+             tol: float = 1e-6, nstart: Optional[np.ndarray] = None) -> Tuple[np.ndarray, int]:
+    """
+    Batched power-iteration PageRank, following nx.pagerank for every column:
+    uniform teleportation, dangling mass redistributed uniformly and convergence
+    when the L1 change drops below n * tol. slot_weights is (n_slots, K), one
+    weighting per column; all K rank vectors are iterated together with one
+    sparse product per step. Returns (ranks of shape (n_nodes, K), iterations).
+    """
+    n = graph.n_nodes
+    slot_weights = np.asarray(slot_weights, dtype=float)
+    if slot_weights.ndim == 1:
+        slot_weights = slot_weights[:, None]
+    k = slot_weights.shape[1]
+    if n == 0:
+        return np.zeros((0, k)), 0
+    slots = np.arange(graph.n_slots)
+    ones = np.ones(graph.n_slots)
+    # Incidence matrices (node x slot) for the source and destination of every link slot
+    out_incidence = sp.csr_matrix((ones, (graph.rows, slots)), shape=(n, graph.n_slots))
+    in_incidence = sp.csr_matrix((ones, (graph.cols, slots)), shape=(n, graph.n_slots))
+    out_weight = out_incidence @ slot_weights
+    dangling = out_weight == 0
+    src_out_weight = out_weight[graph.rows]
+    transition = np.divide(slot_weights, src_out_weight, out=np.zeros_like(slot_weights),
+                           where=src_out_weight != 0)
+    if nstart is None:
+        x = np.full((n, k), 1.0 / n)
+    else:
+        x = np.asarray(nstart, dtype=float).reshape(n, -1) * np.ones((1, k))
+        x = x / x.sum(axis=0)
+    teleport = (1.0 - alpha) / n
+    converged = np.zeros(k, dtype=bool)
+    for iteration in range(1, max_iter + 1):
+        x_last = x
+        dangling_mass = (x_last * dangling).sum(axis=0) / n
+        x = alpha * (in_incidence @ (transition * x_last[graph.rows]) + dangling_mass) + teleport
+        # Columns stop at their own convergence step, as separate nx.pagerank calls would
+        x[:, converged] = x_last[:, converged]
+        converged |= np.abs(x - x_last).sum(axis=0) < n * tol
+        if converged.all():
+            return x, iteration
+    raise PageRankConvergenceError(f"PageRank failed to converge in {max_iter} iterations")
@@ -0,0 +1,298 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Any, Callable, Dict, List, Optional
+
+import duckdb
+import pandas as pd
+from profiling import PROFILER, profile
+
+STAGE_MANIFEST = 'stages.json'
+
+class StageError(RuntimeError):
+    """Raised when a stage fails or its inputs cannot be resolved."""
+
+class Stage:
+    """
+    A named pipeline step: func(ctx, inputs) returns a dict with one value per
+    declared output (DataFrame, dict of DataFrames or None). A stage re-runs only
+    when its key changes: the content hashes of its inputs, the config sections
+    it reads and its params(ctx) (source file fingerprints, CLI options).
+    - lazy: the stage runs only when a later stage needs one of its outputs
+      (the CSV load, whose tables live in DuckDB and are not persisted);
+    - enabled(ctx): False skips the stage for this run.
+    Files a stage writes (reports, charts) are declared with ctx.wrote(path);
+    the stage re-runs when one of them is missing.
+    """
+
+    def __init__(self, name: str, func: Callable, inputs: List[str] = (), outputs: List[str] = (),
+                 config_keys: List[str] = (), params: Optional[Callable] = None, lazy: bool = False,
+                 persist: bool = True, enabled: Optional[Callable] = None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.config_keys = list(config_keys)
+        self.params = params
+        self.lazy = lazy
+        self.persist = persist
+        self.enabled = enabled
+
+class PipelineContext:
+    """
+    State shared by the stages of a run: config, resolved paths, CLI arguments
+    and the DuckDB connection holding the source tables.
+    """
+
+    def __init__(self, config: Dict[str, Any], project_dir: str, args: Any, con):
+        self.config = config
+        self.project_dir = project_dir
+        self.args = args
+        self.con = con
+        self.written: List[str] = []
+
+    def wrote(self, path: str) -> None:
+        """Declares a file written by the running stage."""
+        self.written.append(os.path.abspath(path))
+
+    def path(self, path: str) -> str:
+        """Resolves a config path relative to the project directory."""
+        return path if os.path.isabs(path) else os.path.join(self.project_dir, path)
+
+def file_fingerprint(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Cheap identity of a source file (absolute path, size, mtime), None when missing.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def content_hash(value: Any) -> str:
+    """
+    Content hash of a stage output: row hashes of every DataFrame plus its column names and dtypes.
+    """
+    digest = hashlib.sha256()
+    if value is None:
+        digest.update(b'none')
+    elif isinstance(value, pd.DataFrame):
+        digest.update(json.dumps([[str(col), str(dtype)] for col, dtype in value.dtypes.items()]).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            digest.update(str(key).encode('utf-8'))
+            digest.update(content_hash(item).encode('utf-8'))
+    else:
+        raise TypeError(f"Unsupported stage output type: {type(value).__name__}")
+    return digest.hexdigest()
+
+def _normalize(value: Any) -> Any:
+    # Row positions, not index labels, survive the Parquet round trip
+    if isinstance(value, pd.DataFrame):
+        return value.reset_index(drop=True)
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    return value
+
+def _rows(value: Any) -> int:
+    # Total rows of the DataFrames among a stage's outputs
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_rows(item) for item in value.values())
+    return 0
+
+class Pipeline:
+    """
+    Runs stages in declaration order. Outputs are persisted as Parquet under
+    cache_dir/<stage>/ with their content hashes in cache_dir/stages.json; a stage
+    whose key is unchanged serves its outputs from there (read lazily, only if a
+    stage that does run needs them). Without cache_dir every stage runs.
+    """
+
+    def __init__(self, stages: List[Stage], cache_dir: Optional[str]):
+        self.stages = {stage.name: stage for stage in stages}
+        self.producers = {}
+        for stage in stages:
+            for name in stage.inputs:
+                if name not in self.producers:
+                    raise StageError(f"Stage {stage.name}: input '{name}' is not produced by an earlier stage")
+            for name in stage.outputs:
+                self.producers[name] = stage.name
+        self.cache_dir = cache_dir
+        self.manifest = self._load_manifest()
+        self.values: Dict[str, Any] = {}
+        self.hashes: Dict[str, str] = {}
+        self._io = duckdb.connect()
+
+    # --- persistence ---
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        if not self.cache_dir:
+            return {}
+        path = os.path.join(self.cache_dir, STAGE_MANIFEST)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Stage manifest {path} unreadable, all stages will run: {e}")
+            return {}
+
+    def _save_manifest(self) -> None:
+        path = os.path.join(self.cache_dir, STAGE_MANIFEST)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def _write_frame(self, frame: pd.DataFrame, path: str) -> Dict[str, Any]:
+        if len(frame.columns) == 0:
+            return {'kind': 'empty'}
+        self._io.register('stage_output', frame)
+        try:
+            self._io.execute(f"COPY (SELECT * FROM stage_output) TO '{path}' (FORMAT PARQUET)")
+        finally:
+            self._io.unregister('stage_output')
+        return {'kind': 'frame', 'file': os.path.basename(path)}
+
+    def _write_output(self, stage_dir: str, name: str, value: Any) -> Dict[str, Any]:
+        if value is None:
+            return {'kind': 'none'}
+        if isinstance(value, pd.DataFrame):
+            return self._write_frame(value, os.path.join(stage_dir, f'{name}.parquet'))
+        output_dir = os.path.join(stage_dir, name)
+        os.makedirs(output_dir, exist_ok=True)
+        items = [[str(key), self._write_frame(item, os.path.join(output_dir, f'{index}.parquet'))]
+                 for index, (key, item) in enumerate(value.items())]
+        return {'kind': 'dict', 'dir': name, 'items': items}
+
+    def _read_frame(self, directory: str, entry: Dict[str, Any]) -> pd.DataFrame:
+        if entry['kind'] == 'empty':
+            return pd.DataFrame()
+        return self._io.execute(f"SELECT * FROM read_parquet('{os.path.join(directory, entry['file'])}')").df()
+
+    def _read_output(self, stage_name: str, name: str) -> Any:
+        entry = self.manifest[stage_name]['outputs'][name]
+        stage_dir = os.path.join(self.cache_dir, stage_name)
+        if entry['kind'] == 'none':
+            return None
+        if entry['kind'] == 'dict':
+            output_dir = os.path.join(stage_dir, entry['dir'])
+            return {key: self._read_frame(output_dir, item) for key, item in entry['items']}
+        return self._read_frame(stage_dir, entry)
+
+    def _persist(self, stage: Stage, key: str, outputs: Dict[str, Any], files: List[str]) -> None:
+        entry = {'key': key, 'outputs': {}, 'files': files}
+        if stage.persist:
+            stage_dir = os.path.join(self.cache_dir, stage.name)
+            shutil.rmtree(stage_dir, ignore_errors=True)
+            os.makedirs(stage_dir, exist_ok=True)
+            for name in stage.outputs:
+                entry['outputs'][name] = {'hash': self.hashes[name], **self._write_output(stage_dir, name, outputs[name])}
+        else:
+            entry['outputs'] = {name: {'hash': self.hashes[name], 'kind': 'live'} for name in stage.outputs}
+        self.manifest[stage.name] = entry
+        self._save_manifest()
+
+    # --- execution ---
+
+    def get(self, ctx: PipelineContext, name: str) -> Any:
+        """
+        Value of an artifact: computed this run, read from the stage cache, or
+        produced now by its lazy stage.
+        """
+        if name in self.values:
+            return self.values[name]
+        stage = self.stages[self.producers[name]]
+        if stage.lazy:
+            self._execute(ctx, stage, self._stage_key(ctx, stage))
+        else:
+            self.values[name] = self._read_output(stage.name, name)
+        return self.values[name]
+
+    def _stage_key(self, ctx: PipelineContext, stage: Stage) -> str:
+        key = {
+            'stage': stage.name,
+            'inputs': {name: self.hashes[name] for name in stage.inputs},
+            'config': {section: ctx.config.get(section) for section in stage.config_keys},
+            'params': stage.params(ctx) if stage.params else None,
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _cached(self, stage: Stage, key: str) -> bool:
+        entry = self.manifest.get(stage.name)
+        if not self.cache_dir or not entry or entry.get('key') != key:
+            return False
+        if set(entry.get('outputs', {})) != set(stage.outputs):
+            return False
+        return all(os.path.exists(path) for path in entry.get('files', []))
+
+    def _execute(self, ctx: PipelineContext, stage: Stage, key: str) -> None:
+        logging.info(f"Stage {stage.name}: running")
+        inputs = {name: self.get(ctx, name) for name in stage.inputs}
+        ctx.written = []
+        with profile('stage', stage.name) as record:
+            outputs = stage.func(ctx, inputs)
+            if outputs is None:
+                record['status'] = 'failed'
+                raise StageError(f"Stage {stage.name} failed")
+            record['rows'] = _rows(outputs)
+        missing = [name for name in stage.outputs if name not in outputs]
+        if missing:
+            raise StageError(f"Stage {stage.name} did not produce {missing}")
+        for name in stage.outputs:
+            value = _normalize(outputs[name])
+            self.values[name] = value
+            # Lazy stages (DuckDB tables) are identified by their key, not by content
+            self.hashes[name] = key if stage.lazy else content_hash(value)
+        if self.cache_dir:
+            self._persist(stage, key, {name: self.values[name] for name in stage.outputs}, ctx.written)
+
+    def run(self, ctx: PipelineContext, from_stage: Optional[str] = None, only_stage: Optional[str] = None) -> bool:
+        """
+        Runs the pipeline. from_stage forces that stage and every later one to run;
+        only_stage runs that single stage on the persisted outputs of the earlier ones.
+        """
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        names = list(self.stages)
+        forced_from = names.index(from_stage) if from_stage else len(names)
+        try:
+            for position, stage in enumerate(self.stages.values()):
+                if only_stage and stage.name != only_stage:
+                    if names.index(only_stage) < position:
+                        break
+                    entry = self.manifest.get(stage.name)
+                    if not stage.lazy and (not entry or set(entry.get('outputs', {})) != set(stage.outputs)):
+                        raise StageError(f"No persisted outputs for stage {stage.name}; run the full pipeline first")
+                    for name in stage.outputs:
+                        self.hashes[name] = entry['outputs'][name]['hash'] if entry else None
+                    continue
+                if stage.enabled and not stage.enabled(ctx):
+                    logging.info(f"Stage {stage.name}: skipped")
+                    PROFILER.record('stage', stage.name, 'skipped')
+                    continue
+                key = self._stage_key(ctx, stage)
+                forced = position >= forced_from or stage.name == only_stage
+                if stage.lazy and not forced:
+                    # Runs on demand, when a stage that is not cached reads its outputs
+                    for name in stage.outputs:
+                        self.hashes[name] = key
+                    continue
+                if not forced and self._cached(stage, key):
+                    for name in stage.outputs:
+                        self.hashes[name] = self.manifest[stage.name]['outputs'][name]['hash']
+                    logging.info(f"Stage {stage.name}: up to date, served from the stage cache")
+                    PROFILER.record('stage', stage.name, 'cached')
+                    continue
+                self._execute(ctx, stage, key)
+            return True
+        except StageError as e:
+            logging.error(str(e))
+            return False
+        finally:
+            self._io.close()
@@ -0,0 +1,115 @@
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, peak RSS is left empty
+    resource = None
+
+PROFILE_COLUMNS = ['run_started', 'kind', 'name', 'parent', 'status', 'wall_s', 'cpu_s',
+                   'peak_rss_mb', 'peak_rss_growth_mb', 'rows']
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    High-water mark of this process's resident memory, in MB.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def measure_start() -> Tuple[float, float, Optional[float]]:
+    """(wall clock, process CPU time, peak RSS) at the start of a measured step."""
+    return time.perf_counter(), time.process_time(), peak_rss_mb()
+
+def measure_since(start: Tuple[float, float, Optional[float]]) -> Dict[str, Any]:
+    """
+    Wall time, CPU time and peak RSS of the step started at `start`. peak_rss_growth_mb
+    is how much the step raised the process high-water mark (0 when it stayed below).
+    """
+    wall, cpu, peak = start
+    end_peak = peak_rss_mb()
+    return {
+        'wall_s': round(time.perf_counter() - wall, 4),
+        'cpu_s': round(time.process_time() - cpu, 4),
+        'peak_rss_mb': round(end_peak, 1) if end_peak is not None else None,
+        'peak_rss_growth_mb': round(end_peak - peak, 1) if end_peak is not None else None,
+    }
+
+class RunProfiler:
+    """
+    Records one row per measured step of a run (pipeline stage, source table,
+    chart, Excel tab...): wall time, CPU time, peak RSS and rows. Rows are kept
+    in start order; 'parent' is the enclosing step, whose times include its children.
+    """
+
+    def __init__(self):
+        self.run_started = datetime.now().isoformat(timespec='seconds')
+        self.records: List[Dict[str, Any]] = []
+        self._stack: List[str] = []
+
+    def _new_record(self, kind: str, name: str, status: str) -> Dict[str, Any]:
+        record = {column: None for column in PROFILE_COLUMNS}
+        record.update(run_started=self.run_started, kind=kind, name=name, status=status,
+                      parent=self._stack[-1] if self._stack else None)
+        self.records.append(record)
+        return record
+
+    @contextmanager
+    def span(self, kind: str, name: str) -> Iterator[Dict[str, Any]]:
+        """
+        Measures the enclosed block; the yielded record takes the row count
+        (record['rows'] = n).
+        """
+        record = self._new_record(kind, name, 'ran')
+        self._stack.append(f'{kind}:{name}')
+        start = measure_start()
+        try:
+            yield record
+        except Exception:
+            record['status'] = 'failed'
+            raise
+        finally:
+            self._stack.pop()
+            record.update(measure_since(start))
+
+    def record(self, kind: str, name: str, status: str = 'ran', **fields: Any) -> None:
+        """Adds a step measured elsewhere (chart worker) or not run (cached, skipped)."""
+        self._new_record(kind, name, status).update(fields)
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.records, columns=PROFILE_COLUMNS)
+
+    def write(self, output_dir: str) -> None:
+        """
+        Writes run_profile.json (this run) and appends this run's rows to
+        run_profile.csv, the history used to compare runs.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, 'run_profile.json'), 'w') as f:
+            json.dump({'run_started': self.run_started, 'steps': self.records}, f, indent=2)
+        history = os.path.join(output_dir, 'run_profile.csv')
+        new_file = not os.path.exists(history)
+        with open(history, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=PROFILE_COLUMNS)
+            if new_file:
+                writer.writeheader()
+            writer.writerows(self.records)
+        logging.info(f"Run profile ({len(self.records)} steps) written to {output_dir}")
+
+# Profiler of the current run, shared by the modules that measure their steps
+PROFILER = RunProfiler()
+
+def profile(kind: str, name: str):
+    """Measures a block into the run profile: with profile('chart', name) as record: ..."""
+    return PROFILER.span(kind, name)
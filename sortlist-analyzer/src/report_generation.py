@@ -1,95 +1,220 @@
+import duckdb
+import json
+import os
 import pandas as pd
 import logging
-from typing import Any
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from profiling import PROFILER, profile
+
+# Excel sheet row limit (header included)
+EXCEL_MAX_ROWS = 1_048_576
+# Rows fetched from DuckDB per batch while streaming a sheet
+STREAM_BATCH_ROWS = 10_000
+FLOAT_TYPES = ('DOUBLE', 'FLOAT', 'REAL', 'DECIMAL')
+
+NUM_FORMATS = {
+    'float6': '0.000000',
+    'float4': '0.0000',
+    'float2': '0.00',
+    'int': '0',
+}
+
+def _column_format(col_name: str, sql_type: str) -> Optional[str]:
+    col_lower = col_name.lower()
+    if any(x in col_lower for x in ['pagerank', 'score', 'ratio', 'normalized']):
+        return 'float6'
+    if 'ctr' in col_lower:
+        return 'float4'
+    if 'avg_position' in col_lower:
+        return 'float2'
+    if col_lower in ['clicks', 'impressions', 'hits', 'incoming_links', 'outgoing_links', 'crawl_depth']:
+        return 'int'
+    if sql_type.startswith(FLOAT_TYPES):
+        return 'float2'
+    return None
+
+class FormatPlanner:
+    """
+    Column widths and number formats of a workbook's sheets. Formats are created
+    once per workbook; a plan (width + format per column) is computed once per
+    schema (column names and types), so tabs sharing the AllData columns
+    (Top50Traffic, OrphanPages, DeepPages...) reuse it.
+    """
+
+    def __init__(self, workbook, header_properties: Dict[str, Any]):
+        self.workbook = workbook
+        self.header_format = workbook.add_format(header_properties)
+        self._formats: Dict[str, Any] = {}
+        self._plans: Dict[tuple, List[tuple]] = {}
+
+    def format(self, name: Optional[str]):
+        if name is None:
+            return None
+        if name not in self._formats:
+            self._formats[name] = self.workbook.add_format({'num_format': NUM_FORMATS[name]})
+        return self._formats[name]
+
+    def plan(self, con, relation: str, columns: List[str], types: List[str]) -> List[tuple]:
+        """
+        (width, format) per column. Auto width (max 40) from the header and the
+        string length of the first 100 values, computed column-wise with str.len().
+        """
+        schema = tuple(zip(columns, types))
+        if schema not in self._plans:
+            sample = con.sql(f'SELECT * FROM "{relation}" LIMIT 100').df()
+            lengths = [sample.iloc[:, k].dropna().astype(str).str.len().max() for k in range(len(columns))]
+            self._plans[schema] = [
+                (min(max(len(col), 0 if pd.isna(length) else int(length)) + 2, 40), self.format(_column_format(col, sql_type)))
+                for col, sql_type, length in zip(columns, types, lengths)
+            ]
+        return self._plans[schema]
+
+def write_relation(planner: FormatPlanner, sheet_name: str, con, relation: str) -> int:
+    """
+    Streams a DuckDB table/view to a new sheet, batch by batch, in row order (as
+    the constant_memory workbook requires). Column widths and formats are set up
+    front from the planner. Returns the rows written.
+    """
+    query = f'SELECT * FROM "{relation}"'
+    metadata = con.sql(query)
+    columns = [str(col) for col in metadata.columns]
+    types = [str(sql_type) for sql_type in metadata.types]
+    worksheet = planner.workbook.add_worksheet(sheet_name)
+    for col_num, (width, fmt) in enumerate(planner.plan(con, relation, columns, types)):
+        worksheet.set_column(col_num, col_num, width, fmt)
+    worksheet.write_row(0, 0, columns, planner.header_format)
+    cursor = con.execute(query)
+    row_num = 1
+    while True:
+        batch = cursor.fetchmany(STREAM_BATCH_ROWS)
+        if not batch:
+            break
+        for row in batch:
+            if row_num >= EXCEL_MAX_ROWS:
+                logging.warning(f"{sheet_name}: truncated to the Excel limit of {EXCEL_MAX_ROWS - 1} rows")
+                return row_num - 1
+            worksheet.write_row(row_num, 0, row)
+            row_num += 1
+    return row_num - 1
 
 # Helper to write a DataFrame to Excel with column flattening
-def write_df(writer, sheet_name, data_df, header_format):
+def write_df(planner, sheet_name, data_df, con) -> int:
+    """
+    Streams data_df to a new sheet, returns the number of rows written.
+    """
     if data_df is None or not hasattr(data_df, 'columns'):
         logging.warning(f"DataFrame {sheet_name} is None or does not have a columns attribute, it will not be written.")
-        return
-    # Flatten multi-index columns if necessary
-    if isinstance(data_df.columns, pd.MultiIndex):
-        data_df.columns = ['_'.join([str(c) for c in col if c not in [None, '']]) for col in data_df.columns.values]
-    data_df.columns = [str(c) for c in data_df.columns]
+        return 0
+    _flatten_columns(data_df)
+    rows = 0
     try:
-        data_df.to_excel(writer, sheet_name=sheet_name, index=False)
-        worksheet = writer.sheets[sheet_name]
-        columns = data_df.columns
-        # Define custom formats
-        workbook = writer.book
-        fmt_float6 = workbook.add_format({'num_format': '0.000000'})
-        fmt_float4 = workbook.add_format({'num_format': '0.0000'})
-        fmt_float2 = workbook.add_format({'num_format': '0.00'})
-        fmt_int = workbook.add_format({'num_format': '0'})
-        # Apply optimal format per column
-        for col_num, col_name in enumerate(columns):
-            worksheet.write(0, col_num, col_name, header_format)
-            # Auto width (max 40)
-            max_len = max(
-                [len(str(col_name))] + [len(str(val)) for val in data_df[col_name].head(100).values if pd.notnull(val)]
-            )
-            width = min(max_len + 2, 40)
-            # Choose format
-            col_lower = col_name.lower()
-            if any(x in col_lower for x in ['pagerank', 'score', 'ratio', 'normalized']):
-                fmt = fmt_float6
-            elif 'ctr' in col_lower:
-                fmt = fmt_float4
-            elif 'avg_position' in col_lower:
-                fmt = fmt_float2
-            elif col_lower in ['clicks', 'impressions', 'hits', 'incoming_links', 'outgoing_links', 'crawl_depth']:
-                fmt = fmt_int
-            elif pd.api.types.is_float_dtype(data_df[col_name]):
-                fmt = fmt_float2
-            else:
-                fmt = None
-            if fmt:
-                worksheet.set_column(col_num, col_num, width, fmt)
-            else:
-                worksheet.set_column(col_num, col_num, width)
+        # The frame is scanned in place by DuckDB and streamed to the sheet
+        con.register('report_sheet', data_df)
+        rows = write_relation(planner, sheet_name, con, 'report_sheet')
+        logging.debug(f"{sheet_name}: {rows} rows written")
     except Exception as e:
         logging.error(f"Erreur lors de l'écriture de {sheet_name} : {e}")
         logging.error(f"Colonnes : {data_df.columns}")
+    finally:
+        con.unregister('report_sheet')
+    return rows
 
-def generate_excel_report(df: pd.DataFrame, cat_stats: Any, label_stats: Any, loc_stats: Any, prw_df: pd.DataFrame, cross_metrics: Any, output_file: str, search_engine_analysis: Any = None) -> bool:
+def _flatten_columns(data_df: pd.DataFrame) -> pd.DataFrame:
+    # Flatten multi-index columns if necessary
+    if isinstance(data_df.columns, pd.MultiIndex):
+        data_df.columns = ['_'.join([str(c) for c in col if c not in [None, '']]) for col in data_df.columns.values]
+    data_df.columns = [str(c) for c in data_df.columns]
+    return data_df
+
+def report_tabs(df: pd.DataFrame, cat_stats: Any, label_stats: Any, loc_stats: Any, prw_df: pd.DataFrame,
+                cross_metrics: Any, search_engine_analysis: Any = None) -> Dict[str, pd.DataFrame]:
+    """
+    The report tabs in sheet order: AllData, the stats tabs, WeightedPR, the
+    cross-metric tabs (skipped when empty) and the engine log tabs.
+    """
+    tabs = {'AllData': df}
+    candidates = {'CategoryStats': cat_stats, 'LabelStats': label_stats, 'LocationStats': loc_stats, 'WeightedPR': prw_df}
+    candidates.update(cross_metrics or {})
+    for key, data_df in candidates.items():
+        if data_df is not None and not data_df.empty:
+            tabs[key] = data_df
+    for key, data_df in (search_engine_analysis or {}).items():
+        tabs[key] = data_df
+    return tabs
+
+def generate_excel_report(df: pd.DataFrame, cat_stats: Any, label_stats: Any, loc_stats: Any, prw_df: pd.DataFrame, cross_metrics: Any, output_file: str, search_engine_analysis: Any = None, max_rows: Optional[int] = None, profile_tab: bool = False) -> bool:
+    """
+    Writes the report tabs to an xlsx workbook. With max_rows, the workbook is a
+    summary: tabs longer than max_rows rows (AllData, WeightedPR, ...) are left
+    to the Parquet export. profile_tab adds a last RunProfile tab with the steps
+    measured so far in this run (see profiling.py).
+    """
     import xlsxwriter
     try:
         logging.info("Starting Excel report generation")
-        writer = pd.ExcelWriter(output_file, engine='xlsxwriter')
-        workbook = writer.book
-        header_format = workbook.add_format({
+        # constant_memory: each row is flushed to disk once the next one starts,
+        # so memory stays flat whatever the number of rows
+        workbook = xlsxwriter.Workbook(output_file, {
+            'constant_memory': True,
+            'default_date_format': 'YYYY-MM-DD HH:MM:SS'
+        })
+        con = duckdb.connect()
+        planner = FormatPlanner(workbook, {
             'bold': True,
             'text_wrap': True,
             'valign': 'top',
             'fg_color': '#D7E4BC',
             'border': 1
         })
-        # Main tab
-        write_df(writer, 'AllData', df, header_format)
-        # Stats by category
-        if cat_stats is not None and not cat_stats.empty:
-            write_df(writer, 'CategoryStats', cat_stats, header_format)
-        # Stats by label
-        if label_stats is not None and not label_stats.empty:
-            write_df(writer, 'LabelStats', label_stats, header_format)
-        # Stats by location (optional)
-        if loc_stats is not None and not loc_stats.empty:
-            write_df(writer, 'LocationStats', loc_stats, header_format)
-        # Weighted PageRank
-        if prw_df is not None and not prw_df.empty:
-            write_df(writer, 'WeightedPR', prw_df, header_format)
-        # Cross-metrics and special tabs
-        if cross_metrics:
-            for key, df_cross in cross_metrics.items():
-                if df_cross is not None and not df_cross.empty:
-                    write_df(writer, key, df_cross, header_format)
-        # Engine logs
-        if search_engine_analysis:
-            for key, val in search_engine_analysis.items():
-                write_df(writer, key, val, header_format)
-        writer.close()
+        for key, data_df in report_tabs(df, cat_stats, label_stats, loc_stats, prw_df, cross_metrics,
+                                        search_engine_analysis).items():
+            if max_rows is not None and data_df is not None and len(data_df) > max_rows:
+                logging.info(f"{key} ({len(data_df)} rows) left out of the summary workbook")
+                continue
+            with profile('excel_tab', key) as record:
+                record['rows'] = write_df(planner, key, data_df, con)
+        if profile_tab:
+            write_df(planner, 'RunProfile', PROFILER.frame(), con)
+        workbook.close()
+        con.close()
         logging.info(f"Excel report generated: {output_file}")
         return True
     except Exception as e:
         logging.error(f"Error generating Excel report: {str(e)}")
-        return False 
\ No newline at end of file
+        return False
+
+def export_parquet_report(df: pd.DataFrame, cat_stats: Any, label_stats: Any, loc_stats: Any, prw_df: pd.DataFrame,
+                          cross_metrics: Any, output_dir: str, search_engine_analysis: Any = None) -> bool:
+    """
+    Writes every report tab as <output_dir>/<tab>.parquet with DuckDB COPY ... TO,
+    plus a manifest.json listing each tab's file, row count and column types.
+    """
+    try:
+        logging.info(f"Starting Parquet report export to {output_dir}")
+        os.makedirs(output_dir, exist_ok=True)
+        con = duckdb.connect()
+        manifest = {'generated_at': datetime.now().isoformat(timespec='seconds'), 'tabs': {}}
+        for key, data_df in report_tabs(df, cat_stats, label_stats, loc_stats, prw_df, cross_metrics,
+                                        search_engine_analysis).items():
+            if data_df is None or len(data_df.columns) == 0:
+                continue
+            parquet_file = f'{key}.parquet'
+            try:
+                con.register('report_sheet', _flatten_columns(data_df))
+                relation = con.sql('SELECT * FROM report_sheet')
+                columns = [{'name': str(col), 'type': str(sql_type)} for col, sql_type in zip(relation.columns, relation.types)]
+                con.execute(f"COPY (SELECT * FROM report_sheet) TO '{os.path.join(output_dir, parquet_file)}' (FORMAT PARQUET)")
+                manifest['tabs'][key] = {'file': parquet_file, 'rows': len(data_df), 'columns': columns}
+            except Exception as e:
+                logging.error(f"Error exporting {key} to Parquet: {e}")
+            finally:
+                con.unregister('report_sheet')
+        con.close()
+        with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        logging.info(f"Parquet report exported: {len(manifest['tabs'])} tabs in {output_dir}")
+        return True
+    except Exception as e:
+        logging.error(f"Error exporting Parquet report: {str(e)}")
+        return False
@@ -0,0 +1,162 @@
+import logging
+from typing import Any, Dict
+
+# Declared schema of every crawl source: source column -> (alias, DuckDB type).
+# Only the declared columns are typed; any other column of the export stays
+# VARCHAR, so loading never runs DuckDB's type sniffer. 'enums' lists the
+# low-cardinality columns stored as ENUM once the table is loaded, 'null_values'
+# the placeholder strings read as NULL.
+SOURCE_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    'pages': {
+        'columns': {
+            'Adresse': ('url', 'VARCHAR'),
+            'Type de contenu': ('content_type', 'VARCHAR'),
+            'Code HTTP': ('http_code', 'SMALLINT'),
+            'Statut': ('status', 'VARCHAR'),
+            'Indexabilité': ('indexability', 'VARCHAR'),
+            'Liens entrants': ('incoming_links', 'INTEGER'),
+            'Liens sortants': ('outgoing_links', 'INTEGER'),
+            'Crawl profondeur': ('crawl_depth', 'SMALLINT'),
+            'Nombre de mots': ('word_count', 'INTEGER'),
+        },
+        'options': {'delim': ',', 'quote': '"'},
+        'enums': ['status', 'indexability'],
+    },
+    'edges': {
+        'columns': {
+            'Source': ('src', 'VARCHAR'),
+            'Destination': ('dst', 'VARCHAR'),
+            'Type': ('link_type', 'VARCHAR'),
+            'Position du lien': ('pos', 'VARCHAR'),
+        },
+        'options': {'delim': ',', 'quote': '"'},
+        'enums': ['link_type', 'pos'],
+    },
+    'categories': {
+        'columns': {
+            'Adresse': ('url', 'VARCHAR'),
+            'Category': ('category', 'VARCHAR'),
+            'Label': ('label', 'VARCHAR'),
+            'Country': ('country', 'VARCHAR'),
+            'Location': ('location', 'VARCHAR'),
+        },
+        'options': {'delim': ',', 'quote': '"'},
+        'enums': [],
+    },
+    'traffic': {
+        'columns': {
+            'URL': ('url', 'VARCHAR'),
+            'Clicks': ('clicks', 'INTEGER'),
+            'Impressions': ('impressions', 'INTEGER'),
+            'CTR': ('ctr', 'DOUBLE'),
+            'Average Position': ('avg_position', 'DOUBLE'),
+        },
+        'options': {'delim': ',', 'quote': '"'},
+        'enums': [],
+    },
+    'logs': {
+        'columns': {
+            'event_url': ('event_url', 'VARCHAR'),
+            'event_bot_name': ('event_bot_name', 'VARCHAR'),
+            'event_datetime': ('event_date', 'TIMESTAMP'),
+            'event_status_code': ('event_status', 'SMALLINT'),
+        },
+        'options': {'delim': ',', 'quote': '"'},
+        'enums': ['event_bot_name'],
+    },
+    'backlinks': {
+        'columns': {
+            'TargetURL': ('TargetURL', 'VARCHAR'),
+        },
+        'options': {'delim': ';', 'quote': '"'},
+        'enums': [],
+    },
+    'pagespeed': {
+        'columns': {
+            'URL': ('URL', 'VARCHAR'),
+            'Category': ('Category', 'VARCHAR'),
+            **{f'{platform}_{metric}': (f'{platform}_{metric}', 'DOUBLE')
+               for platform in ['Mobile', 'Desktop']
+               for metric in ['Performance_Score', 'FCP', 'LCP', 'SI', 'TTI', 'TBT', 'CLS']},
+        },
+        'options': {'delim': ',', 'quote': '"'},
+        # Failed PageSpeed API calls are exported as text in the metric columns
+        'null_values': ['API Error'],
+        'enums': [],
+    },
+}
+
+# pandas dtypes used for the sources still read with pandas
+PANDAS_DTYPES = {
+    'VARCHAR': 'str',
+    'SMALLINT': 'Int16',
+    'INTEGER': 'Int32',
+    'BIGINT': 'Int64',
+    'DOUBLE': 'float64',
+}
+
+def _sql_literal(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+def csv_source_sql(source: str, path: str) -> str:
+    """
+    Builds the read_csv() call for a source: explicit dialect, declared column
+    types, every other column read as VARCHAR, parallel parsing.
+    """
+    schema = SOURCE_SCHEMAS[source]
+    types = ', '.join(f"{_sql_literal(col)}: '{sql_type}'" for col, (_, sql_type) in schema['columns'].items())
+    options = ', '.join(f'{key}={_sql_literal(val)}' for key, val in schema['options'].items())
+    if schema.get('null_values'):
+        options += ", nullstr=[" + ', '.join(_sql_literal(val) for val in [''] + schema['null_values']) + "]"
+    return f"read_csv('{path}', header=true, {options}, all_varchar=true, types={{{types}}}, parallel=true)"
+
+def parquet_source_sql(source: str, path: str) -> str:
+    """
+    Builds the read_parquet() subquery for a source exported as Parquet, casting
+    the declared columns to their declared types.
+    """
+    casts = ', '.join(f'CAST("{col}" AS {sql_type}) AS "{col}"'
+                      for col, (_, sql_type) in SOURCE_SCHEMAS[source]['columns'].items())
+    return f"(SELECT * REPLACE ({casts}) FROM read_parquet('{path}'))"
+
+def source_read_sql(source: str, path: str) -> str:
+    """
+    read_parquet() for .parquet files, read_csv() otherwise.
+    """
+    if path.endswith('.parquet'):
+        return parquet_source_sql(source, path)
+    return csv_source_sql(source, path)
+
+def select_sql(source: str) -> str:
+    """
+    SELECT template renaming the declared columns, reading FROM {source}.
+    """
+    columns = ',\n    '.join(f'"{col}" as {alias}' for col, (alias, _) in SOURCE_SCHEMAS[source]['columns'].items())
+    return f'SELECT\n    {columns}\nFROM {{source}}'
+
+def apply_enums(con, table_name: str, source: str) -> None:
+    """
+    Converts the low-cardinality columns of a loaded table to ENUM types built
+    from their distinct values.
+    """
+    for column in SOURCE_SCHEMAS[source]['enums']:
+        enum_type = f'{table_name}_{column}_enum'
+        con.execute(f'DROP TYPE IF EXISTS {enum_type}')
+        con.execute(f'CREATE TYPE {enum_type} AS ENUM (SELECT DISTINCT CAST({column} AS VARCHAR) FROM {table_name} WHERE {column} IS NOT NULL)')
+        con.execute(f'ALTER TABLE {table_name} ALTER {column} TYPE {enum_type}')
+        logging.debug(f"{table_name}.{column} stored as {enum_type}")
+
+def pandas_read_options(source: str) -> Dict[str, Any]:
+    """
+    read_csv keyword arguments (separator, dtypes, null values) for a source read with pandas.
+    """
+    schema = SOURCE_SCHEMAS[source]
+    return {
+        'sep': schema['options']['delim'],
+        'dtype': {col: PANDAS_DTYPES[sql_type] for col, (_, sql_type) in schema['columns'].items()},
+        'na_values': schema.get('null_values'),
+    }
@@ -0,0 +1,107 @@
+import re
+import numpy as np
+import pandas as pd
+import logging
+from typing import Any, Dict, List, Optional
+from data_loading import edges_are_encoded
+
+def linked_urls(con) -> pd.Series:
+    """
+    Distinct link destinations, read through the URL dictionary when edges are id-encoded.
+    """
+    if edges_are_encoded(con):
+        return con.execute('SELECT url as dst FROM urls WHERE id IN (SELECT DISTINCT dst_id FROM edges)').df()['dst']
+    return con.execute('SELECT DISTINCT dst FROM edges').df()['dst']
+
+def detect_orphan_pages(con, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pages that no link points to, as a hashed anti-join (Series.isin) of the
+    page URLs against the link destinations: linear in pages + links.
+    """
+    return df[~df['url'].isin(linked_urls(con))]
+
+def detect_zombie_pages(df: pd.DataFrame, orphan_pages: pd.DataFrame) -> pd.DataFrame:
+    """
+    Linked pages with almost no PageRank, traffic or bot hits.
+    """
+    orphan_urls = orphan_pages['url'] if 'url' in orphan_pages.columns else pd.Series(dtype=object)
+    return df[(df['PageRank'] < 0.0001) & (df['clicks'] < 10) & (df['hits'] < 10) & ~df['url'].isin(orphan_urls)]
+
+# Priority rules per segment, evaluated top to bottom: the first matching rule
+# gives the priority, rows matching none get 'default'. 'when' is a pandas eval
+# expression over the segment columns; <column>_median is the median of that
+# column over all pages.
+DEFAULT_SEGMENT_PRIORITIES: Dict[str, Dict[str, Any]] = {
+    'Zombies': {
+        'rules': [
+            {'priority': 'High', 'when': 'crawl_depth > 2'},
+            {'priority': 'Medium', 'when': 'crawl_depth > 1'},
+        ],
+        'default': 'Low',
+    },
+    'Opportunities': {
+        'rules': [
+            {'priority': 'High', 'when': '(PageRank > 1.5 * PageRank_median or Weighted_PageRank > 1.5 * Weighted_PageRank_median) and word_count > 500'},
+            {'priority': 'Medium', 'when': '(PageRank > PageRank_median or Weighted_PageRank > Weighted_PageRank_median) and word_count > 250'},
+        ],
+        'default': 'Low',
+    },
+    'DeepPages': {
+        'rules': [
+            {'priority': 'High', 'when': 'PageRank > PageRank_median or clicks > clicks_median'},
+            {'priority': 'Medium', 'when': 'PageRank > 0.5 * PageRank_median or clicks > 0.5 * clicks_median'},
+        ],
+        'default': 'Low',
+    },
+}
+
+MEDIAN_SUFFIX = '_median'
+
+def _median_resolver(reference_df: pd.DataFrame, expressions: List[str]) -> Dict[str, float]:
+    """
+    Medians over reference_df of the columns referenced as <column>_median in the expressions.
+    """
+    names = set(re.findall(rf'\b(\w+){MEDIAN_SUFFIX}\b', ' '.join(expressions)))
+    return {f'{name}{MEDIAN_SUFFIX}': reference_df[name].median() for name in names if name in reference_df.columns}
+
+def _eval_mask(segment_df: pd.DataFrame, expression: str, medians: Dict[str, float]) -> np.ndarray:
+    # Missing values compare as False, like the row-wise comparisons they replace
+    return segment_df.eval(expression, resolvers=[medians]).fillna(False).to_numpy(dtype=bool)
+
+def assign_priority(segment_df: pd.DataFrame, spec: Dict[str, Any], reference_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds a last 'Priority' column to a segment: every rule is evaluated as one
+    vectorized mask and np.select picks the first matching rule per row.
+    """
+    if segment_df.empty or not spec.get('rules'):
+        return segment_df
+    rules = spec['rules']
+    medians = _median_resolver(reference_df, [rule['when'] for rule in rules])
+    conditions = [_eval_mask(segment_df, rule['when'], medians) for rule in rules]
+    choices = [rule['priority'] for rule in rules]
+    priority = np.select(conditions, choices, default=spec.get('default', 'Low'))
+    return segment_df.drop(columns='Priority', errors='ignore').assign(Priority=priority)
+
+def segment_priorities(config: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Priority specs from the 'segments' config section, falling back to the built-in rules.
+    """
+    priorities = {name: dict(spec) for name, spec in DEFAULT_SEGMENT_PRIORITIES.items()}
+    for name, spec in ((config or {}).get('segments') or {}).items():
+        priorities[name] = dict(spec)
+    return priorities
+
+def build_config_segments(df: pd.DataFrame, priorities: Dict[str, Dict[str, Any]]) -> Dict[str, pd.DataFrame]:
+    """
+    Segments declared entirely in config: pages matching the 'filter' expression,
+    prioritized with the segment rules. Returns one DataFrame per segment name.
+    """
+    segments = {}
+    for name, spec in priorities.items():
+        if not spec.get('filter'):
+            continue
+        medians = _median_resolver(df, [spec['filter']])
+        segment_df = df[_eval_mask(df, spec['filter'], medians)]
+        segments[name] = assign_priority(segment_df, spec, df)
+        logging.info(f"Segment {name}: {len(segments[name])} pages")
+    return segments
@@ -0,0 +1,434 @@
+import argparse
+import itertools
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import duckdb
+import pandas as pd
+import yaml
+
+# Batch version of Crawl/Scripts/categorize_urls.py: categorize() plus the
+# label/location/pagination post-processing of its main(), same output per URL.
+
+# Cities/countries without a country code in the URL segment
+CITY_COUNTRY_MAP = {
+    'singapore': 'SG',
+    'dubai': 'AE',
+    'abu': 'AE',
+    'abu dhabi': 'AE',
+    'melbourne': 'AU',
+    'cape': 'ZA',
+    'dublin': 'IE',
+    'barcelona': 'ES',
+    'paris': 'FR',
+    'berlin': 'DE',
+    'amsterdam': 'NL'
+}
+
+# Categorization rules, the first matching one wins. 'match' lists the leading
+# path segments: a literal, a list of literals, WILDCARD (any segment) or
+# LOCATION (a segment with a '-' or a known city). 'segments', 'min_segments'
+# and 'max_segments' bound the segment count (default: at least len(match)).
+# 'label' is a fixed text or {'from', 'to', 'join'}: segments[from:to] joined,
+# '-' replaced by spaces, title-cased. 'location' is 'global' (Global), 'last'
+# (last segment), 'search' (last segment that looks like a location) or 'none'.
+WILDCARD = '*'
+LOCATION = '{location}'
+LOCATION_KINDS = ('global', 'last', 'search', 'none')
+
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    {'match': [], 'segments': 0, 'category': 'HomePage', 'location': 'global'},
+    {'match': ['agency'], 'min_segments': 2, 'category': 'Agency'},
+    {'match': ['project'], 'category': 'Project', 'label': 'Project', 'location': 'global'},
+    {'match': ['blog'], 'segments': 1, 'category': 'Blog', 'label': 'Blog Root', 'location': 'global'},
+    {'match': ['blog', 'category'], 'category': 'Blog Category', 'label': {'from': 2, 'join': ' > '},
+     'location': 'global'},
+    {'match': ['blog'], 'category': 'Blog', 'label': 'Blog Article', 'location': 'global'},
+    {'match': ['datahub', 'reports_categories'], 'category': 'Datahub', 'label': 'Datahub Landing',
+     'location': 'global'},
+    {'match': ['datahub', 'reports'], 'category': 'Datahub', 'label': 'Datahub', 'location': 'global'},
+    {'match': ['l'], 'min_segments': 2, 'category': 'Landing Location', 'location': 'search'},
+    # /i/3d-design/paris-fr, /s/social-media-optimization/abu-dhabi-ae
+    {'match': [['i', 's']], 'min_segments': 3, 'category': 'Landing', 'label': {'from': 1, 'to': 2},
+     'location': 'last'},
+    # /3d-design/cape-town-za, /design/singapore
+    {'match': [WILDCARD, LOCATION], 'segments': 2, 'category': 'Landing', 'label': {'from': 0, 'to': 1},
+     'location': 'search'},
+    # /digital-marketing, /photography
+    {'match': [WILDCARD], 'segments': 1, 'category': 'Service Landing', 'label': {'from': 0, 'to': 1},
+     'location': 'global'},
+    {'match': ['event'], 'category': 'Event', 'label': {'from': 1}, 'location': 'global'},
+]
+# Category of the URLs no rule matches
+FALLBACK_RULE: Dict[str, Any] = {'match': [], 'category': 'Other', 'label': {'from': 0}}
+
+# Column headers of the categorized CSV
+OUTPUT_HEADERS = {
+    'url': 'Adresse',
+    'category': 'Category',
+    'label': 'Label',
+    'location': 'Location',
+    'country': 'Country',
+    'pagination': 'Pagination',
+}
+
+# URLs categorized in SQL: http(s) URLs made of printable ASCII only. DuckDB's
+# lower/upper differ from Python's on some non-ASCII characters, and urlparse
+# strips whitespace/control characters, so every other URL goes through the
+# row-wise categorize_url() instead.
+SIMPLE_URL_PATTERN = '(?i)^https?://[!-~]*$'
+
+def _normalize_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
+    unknown = set(rule) - {'match', 'segments', 'min_segments', 'max_segments', 'category', 'label', 'location'}
+    if unknown or 'category' not in rule:
+        raise ValueError(f"Invalid URL category rule {rule}: a category is required, unknown keys {sorted(unknown)}")
+    match = [item if isinstance(item, str) else [str(alternative) for alternative in item]
+             for item in rule.get('match') or []]
+    label = rule.get('label', '')
+    if isinstance(label, dict):
+        to = label.get('to')
+        label = {'from': int(label.get('from', 0)), 'to': None if to is None else int(to),
+                 'join': label.get('join', ' ')}
+        if label['from'] < 0 or (label['to'] is not None and label['to'] < 0):
+            raise ValueError(f"Invalid label in URL category rule {rule}: from/to must be >= 0")
+    elif not isinstance(label, str):
+        raise ValueError(f"Invalid label in URL category rule {rule}: expected a text or from/to/join")
+    location = rule.get('location', 'none')
+    if location not in LOCATION_KINDS:
+        raise ValueError(f"Invalid location '{location}' in URL category rule {rule}, expected one of {LOCATION_KINDS}")
+    min_segments = int(rule.get('segments', rule.get('min_segments', len(match))))
+    max_segments = rule.get('segments', rule.get('max_segments', math.inf))
+    if min_segments < len(match):
+        raise ValueError(f"URL category rule {rule} matches {len(match)} segments but allows {min_segments}")
+    return {'match': match, 'min_segments': min_segments, 'max_segments': max_segments,
+            'category': str(rule['category']), 'label': label, 'location': location}
+
+class _TrieNode:
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.wildcard: Optional['_TrieNode'] = None
+        self.location: Optional['_TrieNode'] = None
+        # (priority, rule) of the rules whose match ends at this node
+        self.rules: List[Tuple[int, Dict[str, Any]]] = []
+
+    def child(self, item: str) -> '_TrieNode':
+        if item == WILDCARD:
+            self.wildcard = self.wildcard or _TrieNode()
+            return self.wildcard
+        if item == LOCATION:
+            self.location = self.location or _TrieNode()
+            return self.location
+        return self.children.setdefault(item, _TrieNode())
+
+class CategoryRules:
+    """
+    Rule table compiled into a path-segment trie: matching a URL walks its
+    segments once along the literal, wildcard and location branches, so it costs
+    O(path depth) whatever the number of rules. to_sql() compiles the same table
+    into the CASE expressions of the batch categorization.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]], city_countries: Dict[str, str]):
+        self.rules = [_normalize_rule(rule) for rule in rules]
+        self.fallback = _normalize_rule(FALLBACK_RULE)
+        self.city_countries = {str(city).lower(): str(country) for city, country in city_countries.items()}
+        self.root = _TrieNode()
+        for priority, rule in enumerate(self.rules):
+            alternatives = [[item] if isinstance(item, str) else item for item in rule['match']]
+            for path in itertools.product(*alternatives):
+                node = self.root
+                for item in path:
+                    node = node.child(item)
+                node.rules.append((priority, rule))
+
+    def is_location(self, segment: str) -> bool:
+        return '-' in segment or segment.lower() in self.city_countries
+
+    def match(self, segments: List[str]) -> Dict[str, Any]:
+        count = len(segments)
+        best = None
+        nodes = [self.root]
+        for depth in range(count + 1):
+            for node in nodes:
+                for priority, rule in node.rules:
+                    if (best is None or priority < best[0]) and rule['min_segments'] <= count <= rule['max_segments']:
+                        best = (priority, rule)
+            if depth == count:
+                break
+            segment = segments[depth]
+            next_nodes = []
+            for node in nodes:
+                if segment in node.children:
+                    next_nodes.append(node.children[segment])
+                if node.wildcard:
+                    next_nodes.append(node.wildcard)
+                if node.location and self.is_location(segment):
+                    next_nodes.append(node.location)
+            if not next_nodes:
+                break
+            nodes = next_nodes
+        return best[1] if best else self.fallback
+
+    def label(self, rule: Dict[str, Any], segments: List[str]) -> str:
+        label = rule['label']
+        if isinstance(label, str):
+            return label
+        return label['join'].join(segments[label['from']:label['to']]).replace('-', ' ').title()
+
+    def location_country(self, rule: Dict[str, Any], segments: List[str]) -> Tuple[str, str]:
+        kind = rule['location']
+        if kind == 'global':
+            return 'Global', ''
+        segment = None
+        if kind == 'last' and segments:
+            segment = segments[-1]
+        elif kind == 'search':
+            segment = next((s for s in reversed(segments) if self.is_location(s)), None)
+        if segment is None:
+            return '', ''
+        parts = segment.split('-')
+        if len(parts) > 1:
+            return ' '.join(p.title() for p in parts[:-1]), parts[-1].upper()
+        return segment.title(), self.city_countries.get(segment.lower(), '')
+
+    def to_sql(self) -> str:
+        return _rules_sql(self)
+
+def compile_rules(config: Optional[Dict[str, Any]] = None) -> CategoryRules:
+    """
+    Compiles DEFAULT_RULES, preceded by the rules of the url_categories config
+    section ({'rules': [...], 'city_countries': {...}}) when given.
+    """
+    config = config or {}
+    return CategoryRules(list(config.get('rules') or []) + DEFAULT_RULES,
+                         {**CITY_COUNTRY_MAP, **(config.get('city_countries') or {})})
+
+DEFAULT_CATEGORY_RULES = compile_rules()
+
+def categorize_url(url: str, rules: CategoryRules = DEFAULT_CATEGORY_RULES) -> Tuple[str, str, str, str, str]:
+    """
+    Row-wise categorization: (category, label, location, country, pagination) of one URL.
+    """
+    parsed = urlparse(url)
+    segments = [s for s in parsed.path.strip('/').split('/') if s]
+    rule = rules.match(segments)
+    location, country = rules.location_country(rule, segments)
+    pagination = 'Yes' if parsed.query and 'page=' in parsed.query else 'No'
+    return rule['category'], rules.label(rule, segments), location, country, pagination
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+def _sql_in(expression: str, values) -> str:
+    values = list(values)
+    if not values:
+        return 'false'
+    return f"{expression} IN ({', '.join(_sql_literal(str(value)) for value in values)})"
+
+def _rules_sql(rules: CategoryRules) -> str:
+    """
+    SELECT over the simple URLs of _cat_input giving the category, the label and
+    location either final or raw (to be title-cased), the country and pagination.
+    The rule table becomes one CASE returning the index of the first matching rule.
+    """
+    def is_location(segment):
+        return f"(contains({segment}, '-') OR {_sql_in(f'lower({segment})', rules.city_countries)})"
+
+    def condition(rule):
+        terms = [f"n >= {rule['min_segments']}"]
+        if rule['max_segments'] != math.inf:
+            terms.append(f"n <= {rule['max_segments']}")
+        for position, item in enumerate(rule['match'], start=1):
+            if item == LOCATION:
+                terms.append(is_location(f'segs[{position}]'))
+            elif isinstance(item, list):
+                terms.append(_sql_in(f'segs[{position}]', item))
+            elif item != WILDCARD:
+                terms.append(f'segs[{position}] = {_sql_literal(item)}')
+        return ' AND '.join(terms)
+
+    def label(rule):
+        label = rule['label']
+        if isinstance(label, str):
+            return _sql_literal(label)
+        # list_slice is 1-based with an inclusive end, -1 being the last element
+        end = -1 if label['to'] is None else label['to']
+        return (f"replace(array_to_string(list_slice(segs, {label['from'] + 1}, {end}), "
+                f"{_sql_literal(label['join'])}), '-', ' ')")
+
+    indexed = list(enumerate(rules.rules + [rules.fallback]))
+    fallback_index = len(rules.rules)
+    by_location = {kind: [index for index, rule in indexed if rule['location'] == kind] for kind in LOCATION_KINDS}
+    rule_case = '\n'.join(f"WHEN {condition(rule)} THEN {index}" for index, rule in indexed[:-1])
+    category_case = '\n'.join(f"WHEN {index} THEN {_sql_literal(rule['category'])}" for index, rule in indexed)
+    label_case = '\n'.join(f"WHEN {index} THEN {label(rule)}" for index, rule in indexed)
+    titled = [index for index, rule in indexed if isinstance(rule['label'], dict)]
+    city_country = ' '.join(f"WHEN {_sql_literal(city)} THEN {_sql_literal(country)}"
+                            for city, country in rules.city_countries.items())
+    return f"""
+        WITH parsed AS (
+            -- urlparse path (after the authority, up to ?/#, without the ;params
+            -- of the last segment) and query, with plain string functions
+            SELECT
+                row_id,
+                url,
+                list_filter(string_split(CASE WHEN contains(path, ';') THEN regexp_replace(path, ';[^/]*$', '')
+                                              ELSE path END, '/'), s -> s <> '') AS segs,
+                CASE WHEN contains(no_fragment, '?') THEN substr(no_fragment, strpos(no_fragment, '?') + 1)
+                     ELSE '' END AS query
+            FROM (
+                SELECT row_id, url, no_fragment,
+                       CASE WHEN contains(authority_path, '/') THEN substr(authority_path, strpos(authority_path, '/'))
+                            ELSE '' END AS path
+                FROM (
+                    SELECT row_id, url, split_part(url, '#', 1) AS no_fragment,
+                           split_part(split_part(substr(url, strpos(url, '://') + 3), '#', 1), '?', 1) AS authority_path
+                    FROM _cat_input
+                    WHERE simple
+                )
+            )
+        ),
+        ruled AS (
+            SELECT *,
+                CASE
+                    {rule_case}
+                    ELSE {fallback_index}
+                END AS rule
+            FROM (SELECT *, len(segs) AS n FROM parsed)
+        ),
+        located AS (
+            SELECT *,
+                CASE
+                    WHEN {_sql_in('rule', by_location['last'])} THEN segs[n]
+                    WHEN {_sql_in('rule', by_location['search'])} THEN list_filter(segs, s -> {is_location('s')})[-1]
+                END AS location_segment
+            FROM ruled
+        ),
+        split AS (
+            SELECT *, string_split(location_segment, '-') AS location_parts
+            FROM located
+        )
+        SELECT
+            row_id,
+            url,
+            CASE rule {category_case} END AS category,
+            CASE rule {label_case} END AS label_raw,
+            {_sql_in('rule', titled)} AS label_titled,
+            CASE
+                WHEN {_sql_in('rule', by_location['global'])} THEN 'Global'
+                WHEN location_segment IS NULL THEN ''
+                WHEN len(location_parts) > 1
+                    THEN array_to_string(list_slice(location_parts, 1, len(location_parts) - 1), ' ')
+                ELSE location_segment
+            END AS location_raw,
+            location_segment IS NOT NULL AS location_titled,
+            CASE
+                WHEN location_segment IS NULL THEN ''
+                WHEN len(location_parts) > 1 THEN upper(location_parts[-1])
+                ELSE CASE lower(location_segment) {city_country} ELSE '' END
+            END AS country,
+            CASE WHEN contains(query, 'page=') THEN 'Yes' ELSE 'No' END AS pagination
+        FROM split
+    """
+
+def categorize_table(con, urls_query: str, table_name: str, rules: CategoryRules = DEFAULT_CATEGORY_RULES) -> int:
+    """
+    Creates table_name(url, category, label, location, country, pagination) from
+    the url column returned by urls_query, in its order. URLs are stripped and empty
+    ones skipped, as categorize_urls.py does. Returns the row count.
+    """
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _cat_input AS
+        SELECT row_number() OVER () AS row_id, url, regexp_matches(url, '{SIMPLE_URL_PATTERN}') AS simple
+        FROM ({urls_query})
+        WHERE url IS NOT NULL
+    """)
+    con.execute(f"CREATE OR REPLACE TEMP TABLE _cat_ruled AS {rules.to_sql()}")
+
+    # str.title() over the distinct raw labels and locations only
+    titles = con.execute("""
+        SELECT label_raw AS raw FROM _cat_ruled WHERE label_titled
+        UNION SELECT location_raw FROM _cat_ruled WHERE location_titled
+    """).df()
+    titles['titled'] = [raw.title() for raw in titles['raw']]
+
+    # Row-wise categorization for the URLs SQL does not cover
+    fallback_rows = []
+    for row_id, url in con.execute("SELECT row_id, url FROM _cat_input WHERE NOT simple ORDER BY row_id").fetchall():
+        url = url.strip()
+        if url:
+            fallback_rows.append((row_id, url, *categorize_url(url, rules)))
+    fallback = pd.DataFrame(fallback_rows, columns=['row_id', 'url', 'category', 'label', 'location', 'country',
+                                                    'pagination'])
+    con.register('_cat_titles', titles)
+    con.register('_cat_fallback', fallback)
+    try:
+        # Explicit types: either frame may be empty
+        con.execute("CREATE OR REPLACE TEMP TABLE _cat_title_map AS "
+                    "SELECT CAST(raw AS VARCHAR) AS raw, CAST(titled AS VARCHAR) AS titled FROM _cat_titles")
+        con.execute(f"""
+            CREATE OR REPLACE TABLE {table_name} AS
+            SELECT url, category, label, location, country, pagination
+            FROM (
+                SELECT
+                    r.row_id, r.url, r.category,
+                    CASE WHEN r.label_titled THEN lt.titled ELSE r.label_raw END AS label,
+                    CASE WHEN r.location_titled THEN ct.titled ELSE r.location_raw END AS location,
+                    r.country, r.pagination
+                FROM _cat_ruled r
+                LEFT JOIN _cat_title_map lt ON lt.raw = r.label_raw
+                LEFT JOIN _cat_title_map ct ON ct.raw = r.location_raw
+                UNION ALL
+                SELECT CAST(row_id AS BIGINT), {', '.join(f'CAST({column} AS VARCHAR)' for column in OUTPUT_HEADERS)}
+                FROM _cat_fallback
+            )
+            ORDER BY row_id
+        """)
+    finally:
+        con.unregister('_cat_titles')
+        con.unregister('_cat_fallback')
+        con.execute("DROP TABLE IF EXISTS _cat_input; DROP TABLE IF EXISTS _cat_ruled; "
+                    "DROP TABLE IF EXISTS _cat_title_map")
+    rows = con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    logging.info(f"{table_name}: {rows} URLs categorized ({len(fallback)} row-wise)")
+    return rows
+
+def categorize_csv(input_path: str, output_path: str, url_column: str = 'Adresse',
+                   rules: CategoryRules = DEFAULT_CATEGORY_RULES,
+                   con: Optional[duckdb.DuckDBPyConnection] = None) -> int:
+    """
+    Categorizes the url_column of a crawl export into a categorized CSV
+    (Adresse, Category, Label, Location, Country, Pagination).
+    """
+    con = con or duckdb.connect()
+    urls_query = (f"SELECT \"{url_column}\" AS url FROM read_csv('{input_path}', header=true, all_varchar=true, "
+                  f"null_padding=true, parallel=true)")
+    rows = categorize_table(con, urls_query, '_categorized', rules)
+    columns = ', '.join(f'{column} AS "{header}"' for column, header in OUTPUT_HEADERS.items())
+    con.execute(f"COPY (SELECT {columns} FROM _categorized) TO '{output_path}' (HEADER, DELIMITER ',')")
+    other = rules.fallback['category']
+    others = con.execute(f"SELECT COUNT(*) FROM _categorized WHERE category = {_sql_literal(other)}").fetchone()[0]
+    if others:
+        logging.warning(f"{others} URLs not clearly categorized (category '{other}')")
+    con.execute("DROP TABLE _categorized")
+    return rows
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    parser = argparse.ArgumentParser(description='Categorize URLs by path pattern (batch, DuckDB)')
+    parser.add_argument('-i', '--input', required=True, help='Input CSV file path')
+    parser.add_argument('-o', '--output', required=True, help='Output CSV file path')
+    parser.add_argument('--url-column', default='Adresse', help="URL column of the input CSV (default: Adresse)")
+    parser.add_argument('--config', help="config.yaml whose url_categories section adds rules and cities")
+    args = parser.parse_args()
+    section = None
+    if args.config:
+        with open(args.config, 'r') as f:
+            section = (yaml.safe_load(f) or {}).get('url_categories')
+    start = time.perf_counter()
+    rows = categorize_csv(args.input, args.output, args.url_column, compile_rules(section))
+    logging.info(f"Wrote {rows} categorized URLs to {args.output} in {time.perf_counter() - start:.1f}s")